@@ -0,0 +1,63 @@
+import time
+from typing import Optional
+
+from cachetools import TLRUCache, TTLCache
+from sqlalchemy import event
+
+from config import settings
+from db.models import User
+from metrics import record_cache_lookup
+
+
+class AuthCache:
+    """In-process cache for the get_current_user hot path.
+
+    - verified tokens map to the user id they carry and expire with the token
+    - users are cached by id as detached copies, with a short TTL, and are
+      dropped as soon as the row is updated or deleted through the ORM
+    """
+
+    def __init__(self, maxsize: int, user_ttl: float):
+        self._tokens = TLRUCache(maxsize=maxsize, ttu=self._token_expiry, timer=time.time)
+        self._users = TTLCache(maxsize=maxsize, ttl=user_ttl)
+
+    @staticmethod
+    def _token_expiry(token: str, value: tuple, now: float) -> float:
+        _, expires_at = value
+        return expires_at
+
+    def get_user_id(self, token: str) -> Optional[int]:
+        entry = self._tokens.get(token)
+        record_cache_lookup("auth_token", entry is not None)
+        return entry[0] if entry else None
+
+    def set_token(self, token: str, user_id: int, expires_at: float) -> None:
+        self._tokens[token] = (user_id, expires_at)
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        user = self._users.get(user_id)
+        record_cache_lookup("auth_user", user is not None)
+        return user
+
+    def set_user(self, user: User) -> None:
+        # A transient copy, so the cached row is never tied to a closed session
+        self._users[user.id] = User(**user.model_dump())
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._tokens.clear()
+        self._users.clear()
+
+
+auth_cache = AuthCache(
+    maxsize=settings.AUTH_CACHE_MAX_SIZE,
+    user_ttl=settings.AUTH_USER_CACHE_TTL_SECONDS
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    auth_cache.invalidate_user(target.id)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Run CryptContext hashing/verification on a dedicated, bounded thread pool.
+
+    Argon2 is CPU-bound but releases the GIL inside argon2-cffi, so a small
+    thread pool spreads it across cores and keeps it off the event loop.
+    At most max_queue operations may be pending; beyond that callers get
+    PasswordHashingBusy instead of queueing without bound.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int, max_queue: int):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHashingBusy("Too many concurrent password operations")
+
+        submitted = time.perf_counter()
+
+        def _timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.total_wait_seconds += started - submitted
+                self.total_run_seconds += time.perf_counter() - started
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, _timed)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify password; the second item is a new hash when the stored one uses outdated parameters"""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.pending,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": 1000 * self.total_wait_seconds / self.completed if self.completed else 0.0,
+            "avg_run_ms": 1000 * self.total_run_seconds / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
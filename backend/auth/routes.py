@@ -3,9 +3,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from sqlmodel import select
 from db.main import get_session
+from db.query_budget import query_budget
 from auth.schemas import UserCreate, UserLogin, UserResponse, Token
 from auth.service import (
-    get_password_hash, 
+    hash_password, 
     authenticate_user, 
     create_access_token,
     get_current_user
@@ -15,6 +16,7 @@ from db.models import User, UserTasteProfile
 router = APIRouter()
 
 @router.post("/register", response_model=UserResponse)
+@query_budget(3)
 async def register(user_data: UserCreate, session: AsyncSession = Depends(get_session)):
     # Check if user exists
     result = await session.execute(select(User).where(
@@ -29,26 +31,23 @@ async def register(user_data: UserCreate, session: AsyncSession = Depends(get_se
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
         password_hash=hashed_password,
         preferred_language=user_data.preferred_language
     )
+    # Default taste profile goes in the same flush and commit as the user
+    user.taste_profile = UserTasteProfile()
     
     session.add(user)
     await session.commit()
-    await session.refresh(user)
-    
-    # Create default taste profile
-    taste_profile = UserTasteProfile(user_id=user.id)
-    session.add(taste_profile)
-    await session.commit()
     
     return user
 
 @router.post("/login", response_model=Token)
+@query_budget(2)
 async def login(user_data: UserLogin, session: AsyncSession = Depends(get_session)):
     user = await authenticate_user(session, user_data.email, user_data.password)
     if not user:
@@ -57,5 +56,5 @@ async def login(user_data: UserLogin, session: AsyncSession = Depends(get_sessio
             detail="Incorrect email or password"
         )
     
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -10,13 +10,44 @@ from auth.schemas import TokenData
 from db.models import User
 from fastapi import Depends, HTTPException, status
 from db.main import get_session
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from auth.cache import auth_cache
+from auth.hashing import PasswordHasher, PasswordHashingBusy
+from metrics import Gauge, gauge_from, phase, timed
+_argon2_params = {
+    "argon2__rounds": settings.ARGON2_TIME_COST,
+    "argon2__memory_cost": settings.ARGON2_MEMORY_COST_KB,
+    "argon2__parallelism": settings.ARGON2_PARALLELISM,
+}
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    **{key: value for key, value in _argon2_params.items() if value is not None}
+)
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+password_hasher_stats = Gauge(
+    "password_hasher",
+    "Password hashing pool: queue depth, completed/rejected jobs and average wait/run time",
+    ("stat",),
+    collect=gauge_from(password_hasher.stats, ("queue_depth", "completed", "rejected", "avg_wait_ms", "avg_run_ms"))
+)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry",
+        headers={"Retry-After": "1"},
+    )
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    """Hash off the event loop on the bounded password pool"""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHashingBusy:
+        raise _busy_exception()
 
 def create_access_token(data: dict, expires_delta:timedelta|None = None):
     to_encode = data.copy()
@@ -33,13 +64,28 @@ async def authenticate_user(session: AsyncSession, email: str, password: str) ->
     result = await session.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none() 
     
-    if not user or not verify_password(password, user.password_hash):
+    if not user:
         return None
     
+    try:
+        with phase("password_hash"):
+            valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+    except PasswordHashingBusy:
+        raise _busy_exception()
+    
+    if not valid:
+        return None
+    
+    # CryptContext parameters changed since this hash was made: upgrade it transparently
+    if new_hash:
+        user.password_hash = new_hash
+        await session.commit()
+    
     return user
 
 security = HTTPBearer()
 
+@timed("auth")
 async def get_current_user(
     session: AsyncSession = Depends(get_session),  # Add this line if get_session is available
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -50,18 +96,39 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+    token = credentials.credentials
     
-    result = await session.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
+    # Fast path: token already verified and user row cached -> no decode, no query
+    user_id = auth_cache.get_user_id(token)
+    if user_id is not None:
+        user = auth_cache.get_user(user_id)
+        if user is not None:
+            return user
+        user = await session.get(User, user_id)
+    else:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+        except JWTError:
+            raise credentials_exception
+        
+        user_id = payload.get("uid")
+        if user_id is not None:
+            user = await session.get(User, user_id)
+        else:
+            # Tokens issued before the uid claim was added
+            result = await session.execute(select(User).where(User.email == email))
+            user = result.scalar_one_or_none()
+        
+        if user is not None and user.email == email:
+            auth_cache.set_token(token, user.id, payload["exp"])
+        else:
+            user = None
     
     if user is None:
         raise credentials_exception
     
+    auth_cache.set_user(user)
     return user
\ No newline at end of file
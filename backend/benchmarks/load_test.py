@@ -0,0 +1,368 @@
+"""End-to-end HTTP load test of the app with an offline LLM.
+
+Starts the FastAPI app from main.py in-process (lifespan included) against a
+fresh SQLite file or the Postgres database given with --database-url, using
+the stub LLM provider (or replay, see llm/providers.py). Virtual users then
+drive a weighted mix of routes at the given concurrency; throughput and
+p50/p95/p99 latency are reported per route and written as JSON so runs on
+different commits can be compared with --compare.
+
+With --url the same mix is sent over HTTP to an already running server
+instead (start it with LLM_PROVIDER=stub to keep it offline).
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test [--concurrency 32] [--duration 30] [--users 16]
+        [--database-url postgresql+asyncpg://...] [--llm-latency-ms 800]
+        [--mix login=5,list_pantry=20,...] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+THEMES = (
+    "pasta", "curry", "soup", "salad", "stir fry", "tacos", "risotto", "stew",
+    "breakfast", "noodles", "grain bowl", "casserole", "sandwich", "dumplings",
+)
+INGREDIENTS = (
+    "rice", "tomato", "onion", "garlic", "spinach", "chickpeas", "lentils", "eggs",
+    "carrot", "potato", "tofu", "mushroom", "pepper", "yogurt", "lemon", "ginger",
+)
+DEFAULT_MIX = {
+    "login": 5,
+    "list_pantry": 20,
+    "add_pantry": 5,
+    "generate_recipe": 10,
+    "list_saved": 25,
+    "transform": 10,
+    "dashboard": 25,
+}
+PASSWORD = "load-test-password"
+
+
+class VirtualUser:
+    def __init__(self, email: str, token: str):
+        self.email = email
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+
+# name -> (route label, request builder)
+Scenario = Tuple[str, Callable[[VirtualUser, random.Random], Dict[str, Any]]]
+SCENARIOS: Dict[str, Scenario] = {
+    "login": ("POST /auth/login", lambda user, rng: {
+        "method": "POST", "url": "/auth/login", "json": {"email": user.email, "password": PASSWORD},
+    }),
+    "list_pantry": ("GET /kitchen/items", lambda user, rng: {
+        "method": "GET", "url": "/kitchen/items", "headers": user.headers,
+    }),
+    "add_pantry": ("POST /kitchen/items", lambda user, rng: {
+        "method": "POST", "url": "/kitchen/items", "headers": user.headers,
+        "json": {"ingredient_name": rng.choice(INGREDIENTS), "quantity": "1", "unit": "pcs"},
+    }),
+    # A small theme pool, so the recipe cache sees both hits and misses
+    "generate_recipe": ("POST /recipes/generate", lambda user, rng: {
+        "method": "POST", "url": "/recipes/generate", "headers": user.headers,
+        "json": {"theme": rng.choice(THEMES), "language": "en"},
+    }),
+    "list_saved": ("GET /recipes/saved", lambda user, rng: {
+        "method": "GET", "url": "/recipes/saved", "headers": user.headers,
+    }),
+    "transform": ("POST /remainings/transform", lambda user, rng: {
+        "method": "POST", "url": "/remainings/transform", "headers": user.headers, "json": {"language": "en"},
+    }),
+    "dashboard": ("GET /dboard/stats", lambda user, rng: {
+        "method": "GET", "url": "/dboard/stats", "headers": user.headers,
+    }),
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = int(weight)
+    return mix
+
+
+def _saved_recipe(rng: random.Random, i: int) -> Dict[str, Any]:
+    ingredients = rng.sample(INGREDIENTS, 6)
+    return {
+        "title": f"{rng.choice(THEMES).title()} {i}",
+        "description": "A weeknight dinner from what's in the pantry.",
+        "ingredients": [{"name": name, "quantity": "1", "unit": "cup"} for name in ingredients],
+        "instructions": [f"Step {step}: prepare, season and cook." for step in range(1, 7)],
+        "cooking_time": "30 minutes",
+        "difficulty": "Medium",
+        "nutrition_info": {"calories": "450", "protein": "20g", "carbs": "50g", "fat": "15g"},
+        "tags": ["dinner", "vegetarian"],
+        "servings": 4,
+    }
+
+
+async def _expect(response: httpx.Response) -> httpx.Response:
+    if response.status_code >= 400:
+        raise RuntimeError(f"setup {response.request.method} {response.request.url.path}: "
+                           f"{response.status_code} {response.text[:200]}")
+    return response
+
+
+async def create_user(client: httpx.AsyncClient, run_id: str, i: int, saved_recipes: int) -> VirtualUser:
+    """Register a user and give them a pantry, leftovers and saved recipes to read back"""
+    rng = random.Random(i)
+    email = f"load-{run_id}-{i}@example.com"
+    await _expect(await client.post("/auth/register", json={
+        "username": f"load_{run_id}_{i}", "email": email, "password": PASSWORD,
+    }))
+    login = await _expect(await client.post("/auth/login", json={"email": email, "password": PASSWORD}))
+    user = VirtualUser(email, login.json()["access_token"])
+
+    soon = datetime.utcnow() + timedelta(days=2)
+    await _expect(await client.post("/kitchen/items/bulk-add", headers=user.headers, json={"items": [
+        {"ingredient_name": name, "quantity": "1", "unit": "pcs", "expiry_date": soon.isoformat() if n < 2 else None}
+        for n, name in enumerate(rng.sample(INGREDIENTS, 8))
+    ]}))
+    for name in rng.sample(INGREDIENTS, 3):
+        await _expect(await client.post("/remainings/ingredients", headers=user.headers, json={"ingredient_name": name}))
+    for n in range(saved_recipes):
+        await _expect(await client.post("/recipes/save-generated", headers=user.headers, json=_saved_recipe(rng, n)))
+    return user
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    users: List[VirtualUser],
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int],
+    seed: int
+) -> Tuple[Dict[str, List[float]], Dict[str, Counter], float]:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(worker: int) -> None:
+        nonlocal issued
+        rng = random.Random(seed + worker)
+        user = users[worker % len(users)]
+        while time.perf_counter() < deadline and (max_requests is None or issued < max_requests):
+            issued += 1
+            route, build = SCENARIOS[rng.choices(names, weights)[0]]
+            started = time.perf_counter()
+            try:
+                response = await client.request(**build(user, rng))
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies[route].append(time.perf_counter() - started)
+            statuses[route][status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(worker) for worker in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    # Nearest-rank, so p99 of a small sample is an observed value rather than an interpolation
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+    status_codes = {str(status): count for status, count in sorted(statuses.items())}
+    if not ordered:
+        # Nothing completed (e.g. a route the run never got to): zeros rather than a crash
+        return {
+            "requests": 0, "errors": errors, "rps": 0.0, "mean_ms": 0.0, "p50_ms": 0.0,
+            "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "status_codes": status_codes,
+        }
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": _percentile(ordered, 50) * 1000,
+        "p95_ms": _percentile(ordered, 95) * 1000,
+        "p99_ms": _percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "status_codes": status_codes,
+    }
+
+
+def _git_commit() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    header = f"{'route':<28}{'reqs':>7}{'err':>6}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}"
+    if baseline:
+        header += f"{'rps vs base':>13}{'p95 vs base':>13}"
+    print(header)
+    rows = list(results["routes"].items()) + [("total", results["total"])]
+    for route, stats in rows:
+        line = (f"{route:<28}{stats['requests']:>7}{stats['errors']:>6}{stats['rps']:>9.1f}"
+                f"{stats['p50_ms']:>8.1f}ms{stats['p95_ms']:>8.1f}ms{stats['p99_ms']:>8.1f}ms")
+        if baseline:
+            base = baseline["total"] if route == "total" else baseline["routes"].get(route)
+            if base and base["rps"] and base["p95_ms"]:
+                line += f"{(stats['rps'] / base['rps'] - 1) * 100:>+12.1f}%"
+                line += f"{(stats['p95_ms'] / base['p95_ms'] - 1) * 100:>+12.1f}%"
+        print(line)
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    run_id = uuid.uuid4().hex[:8]
+    engine = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        lifespan = None
+    else:
+        # Settings are read at import time, so the environment has to be in place first
+        from main import app
+        from db.main import async_engine as engine
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=args.timeout
+        )
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    try:
+        async with client:
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def setup(i: int) -> VirtualUser:
+                async with semaphore:
+                    return await create_user(client, run_id, i, args.saved_recipes)
+
+            print(f"creating {args.users} users...")
+            tasks = [asyncio.create_task(setup(i)) for i in range(args.users)]
+            try:
+                users = await asyncio.gather(*tasks)
+            except BaseException:
+                # Let the other users' requests finish unwinding before the app shuts down
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            print(f"running {args.concurrency} virtual users for {args.duration:.0f}s...")
+            latencies, statuses, elapsed = await run_load(
+                client, users, args.mix, args.concurrency, args.duration, args.requests, args.seed
+            )
+    finally:
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        if engine is not None:
+            await engine.dispose()
+
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    all_statuses = sum(statuses.values(), Counter())
+    return {
+        "meta": {
+            **_git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "database": "external" if args.url else os.environ["DATABASE_URL"].split(":", 1)[0],
+            "llm_provider": None if args.url else os.environ["LLM_PROVIDER"],
+            "llm_latency_ms": None if args.url else args.llm_latency_ms,
+            "concurrency": args.concurrency,
+            "duration_s": elapsed,
+            "users": args.users,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        "total": summarize(all_latencies, all_statuses, elapsed),
+        "routes": {
+            route: summarize(samples, statuses[route], elapsed)
+            for route, samples in sorted(latencies.items())
+        },
+    }
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point the in-process app at a scratch database and an offline LLM"""
+    database_url = args.database_url
+    if database_url is None:
+        scratch = tempfile.mkdtemp(prefix="load-test-")
+        database_url = f"sqlite+aiosqlite:///{os.path.join(scratch, 'load_test.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DB_AUTO_MIGRATE"] = "true"
+    os.environ["LLM_PROVIDER"] = args.llm_provider
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LLM_STUB_JITTER_MS"] = str(args.llm_jitter_ms)
+    os.environ["LLM_STUB_ERROR_RATE"] = str(args.llm_error_rate)
+    os.environ["LLM_STUB_SEED"] = str(args.seed)
+    # Simulated users generate far faster than real ones; measure latency, not 429s
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("SECRET_KEY", "load-test-secret")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load an already running server instead of the in-process app")
+    parser.add_argument("--database-url", help="async SQLAlchemy URL; default is a fresh SQLite file")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--saved-recipes", type=int, default=20, help="saved recipes per user")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="scenario weights, e.g. " + ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--llm-provider", choices=("stub", "replay"), default="stub")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/load_test-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="previous results JSON to show deltas against")
+    args = parser.parse_args()
+
+    if not args.url:
+        configure_environment(args)
+    results = asyncio.run(run_benchmark(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output
+    if output is None:
+        commit = (results["meta"]["commit"] or "unknown")[:10]
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(os.path.dirname(__file__), "results", f"load_test-{commit}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
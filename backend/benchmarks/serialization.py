@@ -0,0 +1,157 @@
+"""Serialization cost per endpoint, before and after the fast JSON path.
+
+"before" is what FastAPI does for a route with response_model that returns ORM
+rows or a hand-built model: serialize_response (validate + dump to python) and
+JSONResponse.render (json.dumps). "default" is the same with the app's new
+ORJSONResponse default. "after" is responses.model_response.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization [--rows 200] [--repeat 200]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from db.models import LeftoverTransformation, PantryItem, SavedRecipe, User, UserTasteProfile
+from leftovers.schemas import SavedTransformationResponse
+from pantry.schemas import PantryItemResponse
+from recipes.schemas import SavedRecipeResponse
+from responses import model_response
+from users.schemas import TasteProfileResponse, UserProfileResponse
+
+
+def _recipe(i: int) -> SavedRecipe:
+    recipe_data = {
+        "title": f"Recipe {i}",
+        "description": "A hearty weeknight dinner with plenty of vegetables. " * 3,
+        "ingredients": [{"name": f"ingredient {j}", "quantity": "1", "unit": "cup"} for j in range(12)],
+        "instructions": [f"Step {j}: stir, season and simmer until done." for j in range(10)],
+        "cooking_time": "30 minutes",
+        "difficulty": "Medium",
+        "servings": 4,
+        "nutrition_info": {"calories": "450", "protein": "20g", "carbs": "50g", "fat": "15g"},
+        "tags": ["dinner", "vegetarian", "quick"],
+    }
+    return SavedRecipe(
+        id=i,
+        user_id=1,
+        recipe_title=recipe_data["title"],
+        recipe_data=recipe_data,
+        ingredients=[ingredient["name"] for ingredient in recipe_data["ingredients"]],
+        dietary_tags=recipe_data["tags"],
+        cooking_time=recipe_data["cooking_time"],
+        difficulty_level=recipe_data["difficulty"],
+        created_at=datetime(2025, 1, 1) + timedelta(minutes=i),
+    )
+
+
+def _pantry_item(i: int) -> PantryItem:
+    return PantryItem(
+        id=i,
+        user_id=1,
+        ingredient_name=f"ingredient {i}",
+        quantity="2",
+        unit="kg",
+        expiry_date=datetime(2025, 1, 1) + timedelta(days=i % 30),
+        category="produce",
+        created_at=datetime(2025, 1, 1),
+    )
+
+
+def _transformation(i: int) -> LeftoverTransformation:
+    return LeftoverTransformation(
+        id=i,
+        user_id=1,
+        title=f"Transformation {i}",
+        description="Turn last night's rice into something new.",
+        transformation_idea="Fry the rice with egg, spring onion and soy sauce. " * 10,
+        used_leftovers=["rice", "peas"],
+        additional_ingredients=["egg", "soy sauce"],
+        cooking_time=15,
+        difficulty="Easy",
+        language="en",
+        created_at=datetime(2025, 1, 1) + timedelta(minutes=i),
+    )
+
+
+def _profile() -> UserProfileResponse:
+    user = User(id=1, username="cook", email="cook@example.com", password_hash="x", created_at=datetime(2025, 1, 1))
+    taste_profile = UserTasteProfile(
+        id=1, user_id=1, likes=["rice", "tofu"], dislikes=["olives"], dietary_preferences=["vegetarian"],
+        allergies=["peanuts"], spice_level=3, oil_preference="low", cooking_time_preference=30,
+        updated_at=datetime(2025, 1, 1),
+    )
+    return UserProfileResponse(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        preferred_language=user.preferred_language,
+        created_at=user.created_at,
+        taste_profile=TasteProfileResponse.model_validate(taste_profile),
+    )
+
+
+def _fastapi_path(response_type: Any, content: Any, response_class) -> Callable[[], Awaitable[bytes]]:
+    field = create_model_field(name="Response", type_=response_type, mode="serialization")
+
+    async def run() -> bytes:
+        serialized = await serialize_response(field=field, response_content=content)
+        return response_class(serialized).body
+
+    return run
+
+
+def _fast_path(response_type: Any, content: Any) -> Callable[[], Awaitable[bytes]]:
+    async def run() -> bytes:
+        return model_response(response_type, content).body
+
+    return run
+
+
+async def _time(fn: Callable[[], Awaitable[bytes]], repeat: int) -> float:
+    await fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat
+
+
+async def run_benchmark(rows: int, repeat: int) -> None:
+    cases = [
+        ("GET /recipes/saved", List[SavedRecipeResponse], [_recipe(i) for i in range(rows)]),
+        ("GET /kitchen/items", List[PantryItemResponse], [_pantry_item(i) for i in range(rows)]),
+        ("GET /remainings/saved-transformations", List[SavedTransformationResponse],
+         [_transformation(i) for i in range(rows)]),
+        ("GET /users/profile", UserProfileResponse, _profile()),
+    ]
+
+    print(f"{'endpoint':<40}{'before':>12}{'default':>12}{'after':>12}{'speedup':>10}")
+    for name, response_type, content in cases:
+        before_path = _fastapi_path(response_type, content, JSONResponse)
+        default_path = _fastapi_path(response_type, content, ORJSONResponse)
+        after_path = _fast_path(response_type, content)
+        # Same bytes as the ORJSONResponse default, just produced without the python detour
+        assert await default_path() == await after_path(), name
+
+        before = await _time(before_path, repeat)
+        default = await _time(default_path, repeat)
+        after = await _time(after_path, repeat)
+        print(f"{name:<40}{before * 1e6:>10.0f}us{default * 1e6:>10.0f}us{after * 1e6:>10.0f}us{before / after:>9.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200, help="rows per list endpoint")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
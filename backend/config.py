@@ -1,20 +1,111 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import os
 
 
 class Settings(BaseSettings):
     DATABASE_URL:str
-    GEMINI_API_KEY: str
+    # Only needed by the providers that call Gemini (gemini, record)
+    GEMINI_API_KEY: Optional[str] = None
+
+    #Database
+    DB_ECHO:bool=False
+    DB_POOL_SIZE:int=10
+    DB_MAX_OVERFLOW:int=20
+    DB_POOL_TIMEOUT:float=30.0
+    DB_POOL_RECYCLE:int=1800
+    DB_POOL_PRE_PING:bool=True
+    DB_STATEMENT_CACHE_SIZE:int=100
+    # Apply pending migrations at startup instead of refusing to start (handy for local dev)
+    DB_AUTO_MIGRATE:bool=False
+    # off | warn (staging) | raise (CI), see db/query_budget.py
+    DB_QUERY_BUDGET_MODE:str="off"
+    DB_QUERY_REPEAT_THRESHOLD:int=3
 
     #JWT
     SECRET_KEY:str
     ALGORITHM:str="HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES:int=30
+    AUTH_CACHE_MAX_SIZE:int=10000
+    AUTH_USER_CACHE_TTL_SECONDS:int=300
+    PASSWORD_HASH_WORKERS:int=os.cpu_count() or 2
+    PASSWORD_HASH_MAX_QUEUE:int=256
+    # Changing these makes existing hashes get upgraded on the user's next login
+    ARGON2_TIME_COST:Optional[int]=None
+    ARGON2_MEMORY_COST_KB:Optional[int]=None
+    ARGON2_PARALLELISM:Optional[int]=None
+
+    #LLM
+    LLM_MODEL_NAME:str="gemini-2.5-flash"
+    LLM_MAX_CONCURRENCY:int=32
+    LLM_TIMEOUT_SECONDS:float=60.0
+    # Ask Gemini for JSON constrained to the response schemas instead of free text
+    LLM_STRUCTURED_OUTPUT:bool=True
+    # gemini | stub | record | replay, see llm/providers.py
+    LLM_PROVIDER:str="gemini"
+    LLM_STUB_LATENCY_MS:float=800.0
+    LLM_STUB_JITTER_MS:float=200.0
+    LLM_STUB_ERROR_RATE:float=0.0
+    LLM_STUB_SEED:int=0
+    LLM_STUB_STREAM_CHUNKS:int=8
+    LLM_RECORDINGS_DIR:str="llm_recordings"
+    LLM_REPLAY_LATENCY_SCALE:float=1.0
+    RECIPE_CACHE_MAX_SIZE:int=1024
+    RECIPE_CACHE_TTL_SECONDS:int=6*60*60
+    RECIPE_BATCH_MAX_SIZE:int=14
+
+    #Rate limits
+    # Per user token buckets, scope -> (requests per minute, burst); "user" counts every
+    # LLM generation the user asks for across all routes. See ratelimit.py
+    RATE_LIMIT_ENABLED:bool=True
+    RATE_LIMITS:Dict[str, Tuple[float, int]]={
+        "recipe": (10, 5),
+        "recipe_batch": (2, 2),
+        "pantry": (6, 3),
+        "transform": (6, 3),
+        "user": (30, 15),
+    }
+    RATE_LIMIT_MAX_USERS:int=10000
+
+    #Metrics
+    # Per-request phase timing middleware and the /metrics endpoint
+    METRICS_ENABLED:bool=True
+
+    #Jobs
+    # ?job=true on the generation routes, see jobs/service.py
+    JOBS_ENABLED:bool=True
+    JOBS_WORKERS:int=4
+    JOBS_MAX_ACTIVE_PER_USER:int=5
+    JOBS_MAX_WAIT_SECONDS:float=30.0
+    JOBS_RESULT_TTL_SECONDS:int=60*60
+    # A job running (or queued) this long is taken to have died with its process and is re-queued
+    JOBS_STALE_AFTER_SECONDS:int=10*60
+    # How often orphaned jobs are recovered and expired ones deleted
+    JOBS_CLEANUP_INTERVAL_SECONDS:int=5*60
+
+    #Pantry suggestions
+    PANTRY_SUGGESTION_COUNT:int=3
+    PANTRY_MATCH_MIN_COVERAGE:float=0.75
+    RECIPE_INDEX_CACHE_SIZE:int=1024
+
+    #Pantry expiry
+    PANTRY_EXPIRY_WINDOW_DAYS:int=3
+    PANTRY_EXPIRY_SWEEPER_ENABLED:bool=True
+    PANTRY_EXPIRY_SWEEP_INTERVAL_SECONDS:int=15*60
+    PANTRY_EXPIRY_SWEEP_BATCH_SIZE:int=500
+    # Users whose expiring-items list is kept in memory; lists also expire after one sweep interval
+    PANTRY_EXPIRY_INDEX_MAX_USERS:int=10000
 
     #CORS
     CORS_ORIGINS:list=["http://localhost:3000","http://127.0.0.1:3000"]
 
+    @model_validator(mode="after")
+    def check_gemini_api_key(self):
+        if self.LLM_PROVIDER in ("gemini", "record") and not self.GEMINI_API_KEY:
+            raise ValueError(f"GEMINI_API_KEY is required with LLM_PROVIDER={self.LLM_PROVIDER}")
+        return self
+
     class Config:
         env_file=".env"
         case_sensitive=True
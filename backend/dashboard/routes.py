@@ -1,46 +1,21 @@
-
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select, func
 from db.main import get_session
+from db.query_budget import query_budget
 from auth.service import get_current_user
-from db.models import User, PantryItem, SavedRecipe, LeftoverIngredient
+from db.models import User
+from dashboard.service import get_user_stats
 
 router = APIRouter()
 
 @router.get("/stats")
+@query_budget(2)
 async def get_dashboard_stats(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     try:
-        # Get pantry items count
-        pantry_result = await session.execute(
-            select(func.count(PantryItem.id)).where(PantryItem.user_id == current_user.id)
-        )
-        pantry_items_count = pantry_result.scalar() or 0
-
-        # Get saved recipes count
-        recipes_result = await session.execute(
-            select(func.count(SavedRecipe.id)).where(SavedRecipe.user_id == current_user.id)
-        )
-        saved_recipes_count = recipes_result.scalar() or 0
-
-        # Get leftover ingredients count
-        leftovers_result = await session.execute(
-            select(func.count(LeftoverIngredient.id)).where(LeftoverIngredient.user_id == current_user.id)
-        )
-        leftover_items_count = leftovers_result.scalar() or 0
-
-        # For recipes generated count, we'll use saved recipes count for now
-        # You might want to track this separately in the future
-        recipes_generated_count = saved_recipes_count
-
-        return {
-            "pantry_items_count": pantry_items_count,
-            "saved_recipes_count": saved_recipes_count,
-            "recipes_generated_count": recipes_generated_count,
-            "leftover_items_count": leftover_items_count
-        }
+        # Counters are maintained by the writes themselves; this is a single primary key lookup
+        return await get_user_stats(session, current_user.id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,122 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.main import async_session_factory
+from db.models import UserStats
+
+GENERATION_COUNTERS = {
+    "recipe": "recipes_generated_count",
+    "pantry": "pantry_suggestions_count",
+    "transformation": "transformations_generated_count",
+}
+
+
+async def bump_user_stats(session: AsyncSession, user_id: int, **deltas: float) -> None:
+    """Add deltas to the user's counters inside the session's current transaction.
+
+    Callers commit, so the counters change atomically with the rows they count.
+    The upsert adds to the stored value rather than read-modify-write, so
+    concurrent requests for the same user don't lose increments.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    table = UserStats.__table__
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(table).values(user_id=user_id, **deltas)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={name: table.c[name] + statement.excluded[name] for name in deltas}
+    )
+    await session.execute(statement)
+
+
+async def record_generation(
+    user_id: Optional[int],
+    kind: str,
+    cache_hit: bool = False,
+    llm_started: Optional[float] = None
+) -> None:
+    """Count one generation request; llm_started is the perf_counter() taken before the LLM call.
+
+    Generations don't write anything else, so this uses its own short
+    transaction. Failures are logged and swallowed: stats must never fail a
+    request that already has its result.
+    """
+    if user_id is None:
+        return
+
+    deltas: Dict[str, float] = {GENERATION_COUNTERS[kind]: 1}
+    if cache_hit:
+        deltas["cache_hits"] = 1
+    if llm_started is not None:
+        deltas["llm_calls"] = 1
+        deltas["llm_seconds_total"] = time.perf_counter() - llm_started
+
+    tally = _generation_tally.get()
+    if tally is not None and tally.user_id == user_id and not tally.flushed:
+        for name, value in deltas.items():
+            tally.deltas[name] = tally.deltas.get(name, 0) + value
+        return
+    await flush_generation_stats(user_id, deltas)
+
+
+class GenerationTally:
+    """record_generation() deltas of a fan-out, written with one upsert instead of N.
+
+    Generations recorded after flush() (a shared LLM call outliving the batch
+    that started it) are written on their own rather than lost.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.deltas: Dict[str, float] = {}
+        self.flushed = False
+
+    def collect(self) -> None:
+        """Make record_generation() in the current task, and tasks it starts, add to this tally"""
+        _generation_tally.set(self)
+
+    async def flush(self) -> None:
+        self.flushed = True
+        await flush_generation_stats(self.user_id, self.deltas)
+
+
+_generation_tally: ContextVar[Optional[GenerationTally]] = ContextVar("generation_tally", default=None)
+
+
+async def flush_generation_stats(user_id: int, deltas: Dict[str, float]) -> None:
+    try:
+        async with async_session_factory() as session:
+            await bump_user_stats(session, user_id, **deltas)
+            await session.commit()
+    except Exception as e:
+        print(f"Failed to record generation stats for user {user_id}: {e}")
+
+
+async def get_user_stats(session: AsyncSession, user_id: int) -> Dict[str, Any]:
+    stats = await session.get(UserStats, user_id) or UserStats(user_id=user_id)
+    generations = (
+        stats.recipes_generated_count
+        + stats.pantry_suggestions_count
+        + stats.transformations_generated_count
+    )
+    return {
+        "pantry_items_count": stats.pantry_items_count,
+        "saved_recipes_count": stats.saved_recipes_count,
+        "recipes_generated_count": stats.recipes_generated_count,
+        "leftover_items_count": stats.leftover_items_count,
+        "saved_transformations_count": stats.saved_transformations_count,
+        "pantry_suggestions_count": stats.pantry_suggestions_count,
+        "transformations_generated_count": stats.transformations_generated_count,
+        "llm_calls": stats.llm_calls,
+        "llm_avg_latency_ms": 1000 * stats.llm_seconds_total / stats.llm_calls if stats.llm_calls else 0.0,
+        "cache_hits": stats.cache_hits,
+        "cache_hit_rate": stats.cache_hits / generations if generations else 0.0,
+    }
@@ -1,16 +1,66 @@
+import time
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import AsyncGenerator, Any, Dict
 
 from config import settings
+from metrics import Gauge, gauge_from
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+def _engine_options() -> Dict[str, Any]:
+    url = make_url(settings.DATABASE_URL)
+    options: Dict[str, Any] = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    # In-memory SQLite lives in a single connection; keep SQLAlchemy's default pool
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
 
 # Create async engine
-async_engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,  # Set to False in production
-    future=True
-)
+async_engine = create_async_engine(settings.DATABASE_URL, **_engine_options())
 
 # Create session factory
 async_session_factory = sessionmaker(
@@ -26,8 +76,32 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
-async def create_db_and_tables():
-    async with async_engine.begin() as conn:
-        # Create all tables
-        from db.models import User, UserTasteProfile, PantryItem, SavedRecipe, LeftoverIngredient
-        await conn.run_sync(SQLModel.metadata.create_all)
\ No newline at end of file
+def get_pool_stats() -> Dict[str, Any]:
+    pool = async_engine.sync_engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+    if isinstance(pool, InstrumentedAsyncPool):
+        stats.update(
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            avg_wait_ms=1000 * pool.total_wait_seconds / pool.checkouts if pool.checkouts else 0.0,
+            max_wait_ms=1000 * pool.max_wait_seconds,
+        )
+    return stats
+
+db_pool = Gauge(
+    "db_pool",
+    "Connection pool state and checkout waits",
+    ("stat",),
+    collect=gauge_from(
+        get_pool_stats,
+        ("size", "checked_in", "checked_out", "overflow", "checkouts", "timeouts", "avg_wait_ms", "max_wait_ms")
+    )
+)
@@ -0,0 +1,219 @@
+"""Versioned schema migrations.
+
+Usage (from the backend directory):
+    python -m db.migrations upgrade     # apply pending migrations
+    python -m db.migrations current     # print the current and latest versions
+
+Each migration runs in its own transaction and records its version in the
+schema_migrations table. Migrations must be safe to run against a database
+that already has the objects they create (IF NOT EXISTS / checkfirst),
+since the baseline creates tables from the current model definitions.
+"""
+import asyncio
+import sys
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+from config import settings
+from db import models
+from db.main import async_engine
+from db.search import create_search_index, saved_recipes_search, saved_transformations_search
+
+schema_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration:
+    def __init__(self, version: int, name: str, upgrade: Callable[[Connection], None]):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    def decorator(fn: Callable[[Connection], None]):
+        MIGRATIONS.append(Migration(version, name, fn))
+        return fn
+    return decorator
+
+
+@migration(1, "baseline tables")
+def _baseline(conn: Connection) -> None:
+    # Tables as they existed before versioned migrations; existing ones are skipped
+    SQLModel.metadata.create_all(conn, tables=[
+        models.User.__table__,
+        models.UserTasteProfile.__table__,
+        models.PantryItem.__table__,
+        models.SavedRecipe.__table__,
+        models.LeftoverIngredient.__table__,
+        models.LeftoverTransformation.__table__,
+    ])
+
+
+@migration(2, "per-user hot path indexes")
+def _hot_path_indexes(conn: Connection) -> None:
+    statements = [
+        # get_pantry_items / get_leftover_ingredients filter on user_id only
+        "CREATE INDEX IF NOT EXISTS ix_pantry_items_user_id ON pantry_items (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_leftover_ingredients_user_id ON leftover_ingredients (user_id)",
+        # get_saved_recipes / get_saved_transformations order newest first per user, and
+        # the summary listings page on (created_at, id), so the tie-breaker is covered too
+        "CREATE INDEX IF NOT EXISTS ix_saved_recipes_user_created_id "
+        "ON saved_recipes (user_id, created_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_leftover_transformations_user_created_id "
+        "ON leftover_transformations (user_id, created_at DESC, id DESC)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+@migration(3, "full-text search indexes")
+def _search_indexes(conn: Connection) -> None:
+    # Postgres: generated tsvector column + GIN index; SQLite: FTS5 table kept in sync by triggers
+    create_search_index(conn, saved_recipes_search)
+    create_search_index(conn, saved_transformations_search)
+
+
+@migration(4, "per-user dashboard stats")
+def _user_stats(conn: Connection) -> None:
+    SQLModel.metadata.create_all(conn, tables=[models.UserStats.__table__])
+    # Backfill the counts the dashboard used to compute on every request. Generations
+    # were never recorded; each saved recipe was generated once, so start from that.
+    conn.execute(text(
+        """
+        INSERT INTO user_stats (
+            user_id, pantry_items_count, saved_recipes_count, leftover_items_count,
+            saved_transformations_count, recipes_generated_count, pantry_suggestions_count,
+            transformations_generated_count, cache_hits, llm_calls, llm_seconds_total
+        )
+        SELECT
+            users.id,
+            (SELECT COUNT(*) FROM pantry_items WHERE pantry_items.user_id = users.id),
+            (SELECT COUNT(*) FROM saved_recipes WHERE saved_recipes.user_id = users.id),
+            (SELECT COUNT(*) FROM leftover_ingredients WHERE leftover_ingredients.user_id = users.id),
+            (SELECT COUNT(*) FROM leftover_transformations WHERE leftover_transformations.user_id = users.id),
+            (SELECT COUNT(*) FROM saved_recipes WHERE saved_recipes.user_id = users.id),
+            0, 0, 0, 0, 0
+        FROM users
+        WHERE users.id NOT IN (SELECT user_id FROM user_stats)
+        """
+    ))
+
+
+@migration(5, "pantry expiry indexes")
+def _expiry_indexes(conn: Connection) -> None:
+    statements = [
+        # Per-user "expiring soon" lookups
+        "CREATE INDEX IF NOT EXISTS ix_pantry_items_user_expiry "
+        "ON pantry_items (user_id, expiry_date) WHERE expiry_date IS NOT NULL",
+        # The sweeper's keyset scan over every user's expiring items
+        "CREATE INDEX IF NOT EXISTS ix_pantry_items_expiry_id "
+        "ON pantry_items (expiry_date, id) WHERE expiry_date IS NOT NULL",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+@migration(6, "generation jobs")
+def _generation_jobs(conn: Connection) -> None:
+    SQLModel.metadata.create_all(conn, tables=[models.GenerationJob.__table__])
+    statements = [
+        # A user's active jobs, checked on every submission (dedupe and the per-user cap)
+        "CREATE INDEX IF NOT EXISTS ix_generation_jobs_user_status "
+        "ON generation_jobs (user_id, status)",
+        # Retried submissions carrying the same Idempotency-Key
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_generation_jobs_user_idempotency_key "
+        "ON generation_jobs (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL",
+        # Startup recovery of queued/running jobs and the retention sweep
+        "CREATE INDEX IF NOT EXISTS ix_generation_jobs_status_created "
+        "ON generation_jobs (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_generation_jobs_expires "
+        "ON generation_jobs (expires_at) WHERE expires_at IS NOT NULL",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+MIGRATIONS.sort(key=lambda m: m.version)
+HEAD = MIGRATIONS[-1].version
+
+
+def _current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return 0
+    versions = conn.execute(select(schema_migrations.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def _apply(conn: Connection, m: Migration) -> None:
+    schema_metadata.create_all(conn)
+    m.upgrade(conn)
+    conn.execute(schema_migrations.insert().values(
+        version=m.version,
+        name=m.name,
+        applied_at=datetime.utcnow()
+    ))
+
+
+async def get_schema_version() -> int:
+    async with async_engine.connect() as conn:
+        return await conn.run_sync(_current_version)
+
+
+async def upgrade(target: Optional[int] = None) -> List[int]:
+    target = HEAD if target is None else target
+    applied = []
+    current = await get_schema_version()
+    for m in MIGRATIONS:
+        if current < m.version <= target:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(_apply, m)
+            print(f"applied migration {m.version}: {m.name}")
+            applied.append(m.version)
+    return applied
+
+
+async def check_schema_version() -> None:
+    """Called at startup instead of create_all; only runs DDL when DB_AUTO_MIGRATE is set"""
+    version = await get_schema_version()
+    if version == HEAD:
+        return
+    if version > HEAD:
+        raise RuntimeError(f"Database schema version {version} is newer than this code ({HEAD})")
+    if settings.DB_AUTO_MIGRATE:
+        await upgrade()
+        return
+    raise RuntimeError(
+        f"Database schema is at version {version}, expected {HEAD}. "
+        "Run `python -m db.migrations upgrade` from the backend directory."
+    )
+
+
+async def _main(command: str) -> None:
+    if command == "upgrade":
+        applied = await upgrade()
+        if not applied:
+            print(f"database already at version {HEAD}")
+    elif command == "current":
+        print(f"current: {await get_schema_version()}, head: {HEAD}")
+    else:
+        raise SystemExit(f"unknown command: {command}")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
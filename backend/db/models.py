@@ -127,4 +127,44 @@ class LeftoverTransformation(SQLModel, table=True):
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
     
-    user: "User" = Relationship(back_populates="leftover_transformations")
\ No newline at end of file
+    user: "User" = Relationship(back_populates="leftover_transformations")
+
+class UserStats(SQLModel, table=True):
+    """Per-user dashboard counters, kept up to date by the writes that change them"""
+    __tablename__ = "user_stats"
+    
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    pantry_items_count: int = Field(default=0)
+    saved_recipes_count: int = Field(default=0)
+    leftover_items_count: int = Field(default=0)
+    saved_transformations_count: int = Field(default=0)
+    recipes_generated_count: int = Field(default=0)
+    pantry_suggestions_count: int = Field(default=0)
+    transformations_generated_count: int = Field(default=0)
+    cache_hits: int = Field(default=0)
+    llm_calls: int = Field(default=0)
+    llm_seconds_total: float = Field(default=0.0)
+
+class GenerationJob(SQLModel, table=True):
+    """A generation submitted in job mode, run by the in-process worker pool (see jobs/)"""
+    __tablename__ = "generation_jobs"
+    
+    id: str = Field(primary_key=True, max_length=32)
+    user_id: int = Field(foreign_key="users.id")
+    kind: str = Field(max_length=32)
+    status: str = Field(default="queued", max_length=16)
+    request: Dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    # Identical active submissions from the same user share one job
+    request_hash: str = Field(max_length=64)
+    idempotency_key: Optional[str] = Field(default=None, max_length=128)
+    result: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    attempts: int = Field(default=0)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+    started_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    # Finished jobs are deleted by the retention sweep once this has passed
+    expires_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
@@ -0,0 +1,44 @@
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for anything that isn't a cursor we issued"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_paginate(query: Select, created_col, id_col, cursor: Optional[str], limit: int) -> Select:
+    """Newest-first page on (created_at, id); fetches one extra row to detect a next page"""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(or_(
+            created_col < created_at,
+            and_(created_col == created_at, id_col < row_id)
+        ))
+    return query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def build_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return items, next_cursor
@@ -0,0 +1,170 @@
+"""Per-request SQL statement budgets and repeated-statement (N+1) detection.
+
+Opt-in with DB_QUERY_BUDGET_MODE: "warn" prints violations (staging), "raise"
+raises QueryBudgetExceeded after the response is sent, so TestClient re-raises
+it in the test and a query-count regression fails CI.
+
+Routes declare their budget under the router decorator:
+
+    @router.get("/profile", response_model=UserProfileResponse)
+    @query_budget(2)
+    async def get_profile(...):
+
+and tests can override any endpoint with query_budgets.set("GET", "/users/profile", 1).
+Independently of budgets, a statement shape (SQL with literals and bound
+parameters folded) executed DB_QUERY_REPEAT_THRESHOLD or more times in one
+request is reported as a likely N+1. For code running in the test's own
+context (services called directly, httpx.ASGITransport), assert_query_budget()
+does the same check around a block.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from config import settings
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|%s|:\w+|\b\d+(?:\.\d+)?\b")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def statement_shape(statement: str) -> str:
+    """SQL with every literal and parameter folded to ?, and IN (?, ?, ...) lists to (?...)"""
+    shape = _LITERALS.sub("?", " ".join(statement.split()))
+    return _PLACEHOLDER_LIST.sub("(?...)", shape)
+
+
+class QueryLog:
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.statements)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        shapes = Counter(statement_shape(statement) for statement, _ in self.statements)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+    def problems(self, max_queries: Optional[int], repeat_threshold: Optional[int]) -> List[str]:
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} statements, budget is {max_queries}")
+        if repeat_threshold:
+            for shape, count in self.repeated(repeat_threshold).items():
+                problems.append(f"{count}x repeated statement (N+1?): {shape}")
+        return problems
+
+    def report(self) -> str:
+        lines = [f"{self.count} statements in {self.total_seconds * 1000:.1f}ms:"]
+        for statement, seconds in self.statements:
+            lines.append(f"  {seconds * 1000:7.2f}ms  {' '.join(statement.split())[:200]}")
+        return "\n".join(lines)
+
+
+_current_log: ContextVar[Optional[QueryLog]] = ContextVar("current_query_log", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    log = QueryLog()
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
+
+
+@contextmanager
+def assert_query_budget(
+    max_queries: Optional[int],
+    repeat_threshold: Optional[int] = settings.DB_QUERY_REPEAT_THRESHOLD
+) -> Iterator[QueryLog]:
+    with track_queries() as log:
+        yield log
+    problems = log.problems(max_queries, repeat_threshold)
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems) + "\n" + log.report())
+
+
+def query_budget(max_queries: int) -> Callable:
+    """Declare the most statements an endpoint may run, auth cache misses included"""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorator
+
+
+class QueryBudgets:
+    """Per-endpoint overrides on top of the budgets declared with @query_budget"""
+
+    def __init__(self):
+        self._overrides: Dict[Tuple[str, str], int] = {}
+
+    def set(self, method: str, path: str, max_queries: int) -> None:
+        self._overrides[(method.upper(), path)] = max_queries
+
+    def clear(self) -> None:
+        self._overrides.clear()
+
+    def for_scope(self, scope) -> Optional[int]:
+        path = getattr(scope.get("route"), "path", None)
+        override = self._overrides.get((scope["method"], path))
+        if override is not None:
+            return override
+        return getattr(scope.get("endpoint"), "__query_budget__", None)
+
+
+query_budgets = QueryBudgets()
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app, mode: str = settings.DB_QUERY_BUDGET_MODE):
+        if mode not in ("warn", "raise"):
+            raise ValueError(f"Unknown DB_QUERY_BUDGET_MODE: {mode}")
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as log:
+            await self.app(scope, receive, send)
+
+        problems = log.problems(query_budgets.for_scope(scope), settings.DB_QUERY_REPEAT_THRESHOLD)
+        if not problems:
+            return
+        endpoint = f"{scope['method']} {getattr(scope.get('route'), 'path', scope['path'])}"
+        message = f"{endpoint}: " + "; ".join(problems)
+        if self.mode == "raise":
+            raise QueryBudgetExceeded(message + "\n" + log.report())
+        print(f"query budget: {message}")
+
+
+def install_query_log(engine) -> None:
+    """Record every statement into the log of the request (or block) being tracked"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_log_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        log = _current_log.get()
+        if log is not None:
+            log.statements.append((statement, time.perf_counter() - context._query_log_started))
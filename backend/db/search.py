@@ -0,0 +1,164 @@
+import re
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import JSON, Column, Float, Table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import models
+
+
+class SearchIndex:
+    """Describes the full-text index over one user-owned table.
+
+    documents maps each searchable field to its source: a column name, or
+    "column.key" for a key inside a JSON column. Fields are listed from most
+    to least important for ranking.
+    """
+
+    def __init__(self, table: Table, documents: Dict[str, str]):
+        self.table = table
+        self.documents = documents
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.table.name}_fts"
+
+    def expressions(self, dialect: str, row: str = "") -> List[str]:
+        """SQL producing each field's text; row qualifies columns (e.g. "new" inside a trigger)"""
+        prefix = f"{row}." if row else ""
+        result = []
+        for source in self.documents.values():
+            column, _, key = source.partition(".")
+            is_json = isinstance(self.table.c[column].type, JSON)
+            if dialect == "postgresql":
+                if key:
+                    result.append(f"({prefix}{column} -> '{key}')::text")
+                else:
+                    result.append(f"{prefix}{column}::text" if is_json else f"{prefix}{column}")
+            elif key:
+                result.append(f"json_extract({prefix}{column}, '$.{key}')")
+            else:
+                # SQLite stores JSON columns as text already
+                result.append(f"{prefix}{column}")
+        return result
+
+
+saved_recipes_search = SearchIndex(models.SavedRecipe.__table__, {
+    "recipe_title": "recipe_title",
+    "ingredients": "ingredients",
+    "dietary_tags": "dietary_tags",
+    "instructions": "recipe_data.instructions",
+})
+
+saved_transformations_search = SearchIndex(models.LeftoverTransformation.__table__, {
+    "title": "title",
+    "used_leftovers": "used_leftovers",
+    "additional_ingredients": "additional_ingredients",
+    "description": "description",
+    "transformation_idea": "transformation_idea",
+})
+
+
+# Databases create_search_index() and full_text_search() know how to handle
+SEARCH_DIALECTS = ("postgresql", "sqlite")
+
+
+def search_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.casefold())
+
+
+def create_search_index(conn: Connection, index: SearchIndex) -> None:
+    """DDL for the dialect's full-text index, plus a backfill of existing rows.
+
+    Fails on any other database than PostgreSQL or SQLite, so an unsupported
+    one is caught by the migration rather than by the first search request.
+    """
+    table = index.table.name
+    if conn.dialect.name not in SEARCH_DIALECTS:
+        raise RuntimeError(
+            f"Full-text search needs one of {', '.join(SEARCH_DIALECTS)}, not {conn.dialect.name}"
+        )
+    if conn.dialect.name == "postgresql":
+        weights = "ABCD"
+        vector = " || ".join(
+            f"setweight(to_tsvector('simple', coalesce({expr}, '')), '{weights[min(i, 3)]}')"
+            for i, expr in enumerate(index.expressions("postgresql"))
+        )
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({vector}) STORED"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (search_vector)"
+        ))
+    else:
+        fts = index.fts_table
+        columns = ", ".join(index.documents)
+        new_values = ", ".join(index.expressions("sqlite", "new"))
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.id; END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.id; "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        ))
+        existing_values = ", ".join(index.expressions("sqlite", table))
+        conn.execute(text(
+            f"INSERT INTO {fts}(rowid, {columns}) SELECT {table}.id, {existing_values} FROM {table} "
+            f"WHERE {table}.id NOT IN (SELECT rowid FROM {fts})"
+        ))
+
+
+async def full_text_search(
+    session: AsyncSession,
+    index: SearchIndex,
+    columns: Sequence[Column],
+    user_id: int,
+    query: str,
+    limit: int,
+    offset: int
+) -> List[Any]:
+    """Ranked rows (selected columns plus "rank", higher is better) for one user's matches"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    table = index.table.name
+    selected = ", ".join(f"{table}.{column.name}" for column in columns)
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+    dialect = session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        # Every term must match; the last one as a prefix so search-as-you-type works
+        params["q"] = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+        sql = (
+            f"SELECT {selected}, ts_rank(search_vector, query) AS rank "
+            f"FROM {table}, to_tsquery('simple', :q) AS query "
+            f"WHERE {table}.user_id = :user_id AND search_vector @@ query "
+            f"ORDER BY rank DESC, {table}.id DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        # SQLite; the search migration refuses to run on anything else
+        fts = index.fts_table
+        params["q"] = " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+        weights = ", ".join(str(float(len(index.documents) - i)) for i in range(len(index.documents)))
+        sql = (
+            f"SELECT {selected}, -bm25({fts}, {weights}) AS rank "
+            f"FROM {fts} JOIN {table} ON {table}.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :q AND {table}.user_id = :user_id "
+            f"ORDER BY rank DESC, {table}.id DESC LIMIT :limit OFFSET :offset"
+        )
+
+    statement = text(sql).columns(*columns, rank=Float)
+    result = await session.execute(statement, params)
+    return result.all()
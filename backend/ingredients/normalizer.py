@@ -0,0 +1,189 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set
+
+# Preparation words and units that don't change what the ingredient is
+DESCRIPTORS = {
+    "fresh", "freshly", "chopped", "diced", "sliced", "minced", "grated", "crushed",
+    "shredded", "peeled", "finely", "roughly", "thinly", "large", "small", "medium",
+    "raw", "organic", "whole", "leftover", "cooked", "boiled", "frozen", "ripe",
+    "some", "few", "of",
+    "cup", "cups", "tbsp", "tsp", "tablespoon", "tablespoons", "teaspoon", "teaspoons",
+    "g", "gm", "gms", "gram", "grams", "kg", "ml", "l", "litre", "liter", "oz", "lb", "lbs",
+    "pinch", "handful", "bunch",
+}
+
+# canonical name -> aliases (English variants plus common Hindi, Spanish and French names)
+SYNONYMS: Dict[str, List[str]] = {
+    "coriander": ["cilantro", "coriander leaves", "coriander leaf", "chinese parsley", "dhania", "hara dhania", "cilantro leaves"],
+    "green onion": ["scallion", "spring onion", "salad onion", "hara pyaz"],
+    "onion": ["pyaz", "pyaaz", "kanda", "cebolla", "oignon"],
+    "garlic": ["lahsun", "lehsun", "ajo", "ail", "garlic clove"],
+    "ginger": ["adrak", "jengibre", "gingembre"],
+    "tomato": ["tamatar", "tomate"],
+    "potato": ["aloo", "alu", "papa", "patata", "pomme de terre"],
+    "eggplant": ["aubergine", "brinjal", "baingan"],
+    "zucchini": ["courgette"],
+    "bell pepper": ["capsicum", "shimla mirch", "sweet pepper", "pimiento"],
+    "chili": ["chilli", "chile", "green chili", "green chilli", "hari mirch", "mirch"],
+    "chickpea": ["garbanzo", "garbanzo bean", "chana", "kabuli chana", "garbanzos"],
+    "yogurt": ["yoghurt", "curd", "dahi", "plain yogurt"],
+    "all purpose flour": ["maida", "plain flour", "ap flour", "flour"],
+    "whole wheat flour": ["atta", "wheat flour"],
+    "spinach": ["palak", "espinaca", "epinard"],
+    "cauliflower": ["gobi", "phool gobi", "coliflor", "chou fleur"],
+    "cumin": ["jeera", "zeera", "comino", "cumin seed"],
+    "turmeric": ["haldi", "curcuma"],
+    "rice": ["chawal", "arroz", "riz"],
+    "lentil": ["dal", "daal", "dhal", "lenteja"],
+    "chicken": ["pollo", "poulet", "murgh"],
+    "cottage cheese": ["paneer", "indian cottage cheese"],
+    "ghee": ["clarified butter"],
+    "shrimp": ["prawn", "jhinga", "camaron", "crevette"],
+    "okra": ["bhindi", "lady finger", "ladies finger"],
+    "peanut": ["groundnut", "moongphali", "cacahuete", "mani"],
+    "egg": ["anda", "huevo", "oeuf"],
+    "milk": ["doodh", "leche", "lait"],
+    "butter": ["makhan", "mantequilla", "beurre"],
+    "cheese": ["queso", "fromage"],
+    "lemon": ["nimbu", "limon", "citron"],
+    "corn": ["maize", "sweetcorn", "sweet corn", "makka", "maiz"],
+}
+
+# Plurals that the suffix rules would get wrong
+IRREGULAR_SINGULARS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "chillies": "chilli",
+    "chilies": "chili",
+    "tomatoes": "tomato",
+    "potatoes": "potato",
+    "mangoes": "mango",
+    "geese": "goose",
+    "mice": "mouse",
+    "anchovies": "anchovy",
+    "cookies": "cookie",
+    "brownies": "brownie",
+    "smoothies": "smoothie",
+    "veggies": "veggie",
+}
+
+# Words ending in "s" that are already singular
+SINGULAR_S = {"hummus", "couscous", "asparagus", "molasses", "swiss", "brussels", "citrus", "harissa", "glass", "grass", "bass"}
+
+_NON_WORD = re.compile(r"[^\w\s]|\d|_")
+
+
+def singularize(word: str) -> str:
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if len(word) <= 3 or word in SINGULAR_S or word.endswith(("ss", "us", "is")):
+        return word
+    # "pies" and "ties" are a short "-ie" word plus "s", not "-y" plurals
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "sses", "xes", "zes", "oes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _tokens(name: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", name.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(" ", text)
+    tokens = [token for token in text.split() if token not in DESCRIPTORS]
+    if tokens:
+        tokens[-1] = singularize(tokens[-1])
+    return tokens
+
+
+def _build_alias_table() -> Dict[str, str]:
+    table = {}
+    for canonical, aliases in SYNONYMS.items():
+        key = " ".join(_tokens(canonical))
+        table[key] = key
+        for alias in aliases:
+            table[" ".join(_tokens(alias))] = key
+    return table
+
+
+# Precompiled once at import: normalized alias -> canonical name
+ALIASES = _build_alias_table()
+
+# canonical name -> every normalized spelling of it, used to seed matcher tries
+SPELLINGS: Dict[str, Set[str]] = {}
+for _alias, _canonical in ALIASES.items():
+    SPELLINGS.setdefault(_canonical, set()).add(_alias)
+
+
+@lru_cache(maxsize=8192)
+def canonicalize(name: str) -> str:
+    """Map a free-form ingredient name to its canonical form ("Fresh Cilantro Leaves" -> "coriander")"""
+    key = " ".join(_tokens(name or ""))
+    return ALIASES.get(key, key)
+
+
+def canonical_set(names: Iterable[str]) -> Set[str]:
+    return {key for key in (canonicalize(name) for name in names or []) if key}
+
+
+def dedupe(names: Iterable[str]) -> List[str]:
+    """Drop names that canonicalize to one already seen, keeping the first spelling"""
+    seen = set()
+    result = []
+    for name in names or []:
+        key = canonicalize(name)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(name)
+    return result
+
+
+class IngredientMatcher:
+    """Match ingredient names against a fixed set of terms (allergies, dislikes).
+
+    Terms and all their known spellings are stored in a token trie, so a
+    name matches when any contiguous run of its tokens spells a term: an
+    allergy to "peanut" also excludes "peanut butter" and "groundnut oil",
+    and "prawns" is caught by "shrimp".
+    """
+
+    _END = object()
+
+    def __init__(self, terms: Iterable[str]):
+        self._trie: dict = {}
+        self.terms = canonical_set(terms)
+        for term in self.terms:
+            for spelling in SPELLINGS.get(term, {term}):
+                node = self._trie
+                for token in spelling.split():
+                    node = node.setdefault(token, {})
+                node[self._END] = True
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def matches(self, name: str) -> bool:
+        if not self.terms:
+            return False
+        canonical = canonicalize(name)
+        if canonical in self.terms:
+            return True
+        tokens = canonical.split()
+        for start in range(len(tokens)):
+            node = self._trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if self._END in node:
+                    return True
+        return False
+
+    def filter(self, names: Iterable[str]) -> List[str]:
+        return [name for name in names if not self.matches(name)]
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from config import settings
+from db.main import get_session
+from db.query_budget import query_budget
+from responses import model_response
+from auth.service import get_current_user
+from db.models import User
+from jobs.schemas import JobResponse
+from jobs.service import JobLimitExceeded, submit_job, wait_for_job
+from ratelimit import enforce_rate_limit
+
+# For the `responses=` of routes that accept ?job=true, so the 202 body shows up in OpenAPI
+JOB_RESPONSES = {202: {"model": JobResponse, "description": "Accepted as a job; poll GET /jobs/{id} for the result"}}
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=JobResponse)
+@query_budget(3)
+async def get_job_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=settings.JOBS_MAX_WAIT_SECONDS),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    job = await wait_for_job(session, job_id, current_user.id, wait)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return model_response(JobResponse, job)
+
+
+async def job_accepted(
+    session: AsyncSession,
+    user_id: int,
+    kind: str,
+    request: BaseModel,
+    idempotency_key: Optional[str] = None,
+    rate_limit_scope: Optional[str] = None
+) -> Response:
+    """202 with the queued (or deduplicated) job, for a route called with ?job=true.
+
+    The rate limit is only charged for a new job: a retry with the same
+    Idempotency-Key, or a repeat of a job still running, is free.
+    """
+    if not settings.JOBS_ENABLED:
+        raise HTTPException(status_code=400, detail="Job mode is disabled")
+    charge = (lambda: enforce_rate_limit(user_id, rate_limit_scope)) if rate_limit_scope else None
+    try:
+        job = await submit_job(session, user_id, kind, request, idempotency_key, on_create=charge)
+    except JobLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    response = model_response(JobResponse, job, status_code=202)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return response
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+from datetime import datetime
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    # The body the synchronous route would have returned, once the job has succeeded
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,410 @@
+"""Job mode for the long generation routes.
+
+`?job=true` on /recipes/generate, /recipes/suggest-from-pantry and
+/remainings/transform stores a GenerationJob and answers 202 with its id right
+away. A pool of JOBS_WORKERS in-process workers runs it with the same service
+code as the synchronous route, and GET /jobs/{id}?wait=N polls or long-polls
+for the result.
+
+- Job state lives in generation_jobs, so a result outlives the request that
+  submitted it. At startup and on every sweep, jobs orphaned by a dead
+  process (running for JOBS_STALE_AFTER_SECONDS, or still queued after it)
+  are queued again.
+- Workers claim a job with a conditional UPDATE (queued -> running), so several
+  app processes sharing one database never run the same job twice.
+- The same Idempotency-Key, or an identical request while the first one is
+  still active, returns the existing job instead of starting duplicate work.
+  Active jobs per user are capped at JOBS_MAX_ACTIVE_PER_USER.
+- Finished jobs are kept for JOBS_RESULT_TTL_SECONDS, then deleted by the
+  periodic retention sweep.
+"""
+import asyncio
+import hashlib
+import json
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from config import settings
+from db.main import async_session_factory
+from db.models import GenerationJob, User
+from leftovers.schemas import LeftoverTransformRequest, TransformationSuggestion
+from leftovers.service import leftover_service
+from llm.scheduler import schedule_as
+from metrics import Counter, Gauge
+from recipes.schemas import PantryRecipeResponse, PantrySuggestionRequest, RecipeGenerationRequest, RecipeResponse
+from recipes.service import recipe_service
+from responses import dump_jsonable
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+# A job whose worker died with its process this many times is failed instead of re-queued
+MAX_ATTEMPTS = 3
+
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+Runner = Callable[[BaseModel, User, AsyncSession], Awaitable[Any]]
+
+
+async def _run_recipe(request: RecipeGenerationRequest, user: User, session: AsyncSession) -> Any:
+    return await recipe_service.generate_recipe(request, user, session)
+
+
+async def _run_pantry(request: PantrySuggestionRequest, user: User, session: AsyncSession) -> Any:
+    return await recipe_service.generate_pantry_suggestions(request, user, session)
+
+
+async def _run_transformation(request: LeftoverTransformRequest, user: User, session: AsyncSession) -> Any:
+    return await leftover_service.transform_user_leftovers(session, user.id, request.language)
+
+
+# kind -> (request model, response type of the synchronous route, runner)
+JOB_KINDS: Dict[str, Tuple[Type[BaseModel], Any, Runner]] = {
+    "recipe": (RecipeGenerationRequest, RecipeResponse, _run_recipe),
+    "pantry": (PantrySuggestionRequest, List[PantryRecipeResponse], _run_pantry),
+    "transformation": (LeftoverTransformRequest, List[TransformationSuggestion], _run_transformation),
+}
+
+
+def _request_hash(kind: str, request_data: Dict[str, Any]) -> str:
+    canonical = json.dumps([kind, request_data], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def _job_by_idempotency_key(session: AsyncSession, user_id: int, idempotency_key: str) -> Optional[GenerationJob]:
+    result = await session.execute(
+        select(GenerationJob).where(
+            GenerationJob.user_id == user_id,
+            GenerationJob.idempotency_key == idempotency_key
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def submit_job(
+    session: AsyncSession,
+    user_id: int,
+    kind: str,
+    request: BaseModel,
+    idempotency_key: Optional[str] = None,
+    on_create: Optional[Callable[[], None]] = None
+) -> GenerationJob:
+    """Queue a job, or return the existing one this submission duplicates.
+
+    on_create runs just before a new job is inserted (not for a duplicate) and may raise to refuse it.
+    """
+    request_data = request.model_dump(mode="json")
+    request_hash = _request_hash(kind, request_data)
+
+    if idempotency_key:
+        existing = await _job_by_idempotency_key(session, user_id, idempotency_key)
+        if existing:
+            if existing.request_hash != request_hash:
+                raise ValueError("Idempotency-Key was already used for a different request")
+            return existing
+
+    # Served by ix_generation_jobs_user_status
+    result = await session.execute(
+        select(GenerationJob).where(
+            GenerationJob.user_id == user_id,
+            GenerationJob.status.in_(ACTIVE_STATUSES)
+        )
+    )
+    active = result.scalars().all()
+    for job in active:
+        if job.request_hash == request_hash:
+            return job
+    if len(active) >= settings.JOBS_MAX_ACTIVE_PER_USER:
+        raise JobLimitExceeded(f"Too many active jobs (limit is {settings.JOBS_MAX_ACTIVE_PER_USER})")
+    if on_create is not None:
+        on_create()
+
+    job = GenerationJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        kind=kind,
+        request=request_data,
+        request_hash=request_hash,
+        idempotency_key=idempotency_key
+    )
+    session.add(job)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # A concurrent retry with the same Idempotency-Key got there first
+        await session.rollback()
+        existing = await _job_by_idempotency_key(session, user_id, idempotency_key)
+        if existing is None:
+            raise
+        return existing
+
+    job_workers.enqueue(job.id)
+    return job
+
+
+async def get_job(session: AsyncSession, job_id: str, user_id: int) -> Optional[GenerationJob]:
+    result = await session.execute(
+        select(GenerationJob)
+        .where(GenerationJob.id == job_id, GenerationJob.user_id == user_id)
+        # Re-reads during a long poll must see the worker's update, not the identity map
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+async def wait_for_job(session: AsyncSession, job_id: str, user_id: int, wait: float) -> Optional[GenerationJob]:
+    """The job, once it has finished or `wait` seconds have passed.
+
+    A worker in this process wakes the waiter as soon as the job finishes. A job
+    run by another process is only seen finished by the read at the deadline.
+    """
+    async with job_notifier.watch(job_id) as finished:
+        job = await get_job(session, job_id, user_id)
+        if job is None or job.status in FINISHED_STATUSES or wait <= 0:
+            return job
+        # End the read transaction, so a long poll never pins a pooled connection
+        await session.commit()
+        try:
+            await asyncio.wait_for(finished.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+        return await get_job(session, job_id, user_id)
+
+
+class JobNotifier:
+    """Wakes long polls waiting on a job when a worker in this process finishes it"""
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+
+    @asynccontextmanager
+    async def watch(self, job_id: str) -> AsyncIterator[asyncio.Event]:
+        # Registered before the first read, so a job finishing in between is not missed
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, set()).add(event)
+        try:
+            yield event
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    def notify(self, job_id: str) -> None:
+        for event in self._waiters.pop(job_id, ()):
+            event.set()
+
+
+job_notifier = JobNotifier()
+
+
+async def _finish(session: AsyncSession, job_id: str, **values: Any) -> None:
+    finished_at = datetime.utcnow()
+    await session.execute(
+        update(GenerationJob)
+        .where(GenerationJob.id == job_id)
+        .values(
+            finished_at=finished_at,
+            expires_at=finished_at + timedelta(seconds=settings.JOBS_RESULT_TTL_SECONDS),
+            **values
+        )
+    )
+    await session.commit()
+
+
+async def run_job(job_id: str) -> None:
+    async with async_session_factory() as session:
+        claimed = await session.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == job_id, GenerationJob.status == QUEUED)
+            .values(status=RUNNING, started_at=datetime.utcnow(), attempts=GenerationJob.attempts + 1)
+        )
+        await session.commit()
+        if claimed.rowcount != 1:
+            # Claimed by another worker or process, or no longer queued
+            return
+
+        # Like the synchronous route, the session stays open for the whole generation;
+        # JOBS_WORKERS bounds how many connections that can hold
+        job = await session.get(GenerationJob, job_id)
+        # Read up front: a rollback below expires the instance
+        kind, user_id, request_data = job.kind, job.user_id, job.request
+        request_model, response_type, run = JOB_KINDS[kind]
+        # The user's queued jobs share the LLM fairly with everyone else's requests
+        schedule_as(user_id)
+        try:
+            user = await session.get(User, user_id)
+            if user is None:
+                raise ValueError("User not found")
+            result = await run(request_model(**request_data), user, session)
+            values = {"status": SUCCEEDED, "result": dump_jsonable(response_type, result)}
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back, so the next start runs it again.
+            # If that fails too, recover_jobs re-queues it once it goes stale.
+            try:
+                await session.rollback()
+                await session.execute(
+                    update(GenerationJob)
+                    .where(GenerationJob.id == job_id)
+                    .values(status=QUEUED, started_at=None)
+                )
+                await session.commit()
+            except Exception as e:
+                print(f"job {job_id} could not be re-queued: {e}")
+            raise
+        except Exception as e:
+            await session.rollback()
+            values = {"status": FAILED, "error": str(e)}
+        await _finish(session, job_id, **values)
+
+    jobs_finished.inc(kind, values["status"])
+    job_notifier.notify(job_id)
+
+
+async def recover_jobs(queued_before: Optional[datetime] = None) -> List[str]:
+    """Re-queue jobs orphaned by a dead process; returns the ids of the queued jobs, oldest first.
+
+    At startup every queued job is returned; the periodic sweep passes queued_before
+    to leave alone the jobs other processes have only just queued.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.JOBS_STALE_AFTER_SECONDS)
+    async with async_session_factory() as session:
+        orphaned = [GenerationJob.status == RUNNING, GenerationJob.started_at < stale]
+        await session.execute(
+            update(GenerationJob)
+            .where(*orphaned, GenerationJob.attempts >= MAX_ATTEMPTS)
+            .values(
+                status=FAILED,
+                error="Job was interrupted too many times",
+                finished_at=now,
+                expires_at=now + timedelta(seconds=settings.JOBS_RESULT_TTL_SECONDS)
+            )
+        )
+        await session.execute(
+            update(GenerationJob).where(*orphaned).values(status=QUEUED, started_at=None)
+        )
+        await session.commit()
+        query = select(GenerationJob.id).where(GenerationJob.status == QUEUED)
+        if queued_before is not None:
+            query = query.where(GenerationJob.created_at < queued_before)
+        result = await session.execute(query.order_by(GenerationJob.created_at))
+        return list(result.scalars().all())
+
+
+async def purge_expired_jobs(now: Optional[datetime] = None) -> int:
+    """Delete finished jobs past their retention; returns how many were deleted"""
+    async with async_session_factory() as session:
+        # Served by ix_generation_jobs_expires
+        result = await session.execute(
+            delete(GenerationJob).where(GenerationJob.expires_at < (now or datetime.utcnow()))
+        )
+        await session.commit()
+    return result.rowcount
+
+
+class JobWorkerPool:
+    """In-process workers draining the job queue, plus the periodic recovery and retention sweep"""
+
+    def __init__(self, workers: int, cleanup_interval_seconds: float):
+        self.workers = workers
+        self.cleanup_interval_seconds = cleanup_interval_seconds
+        self.running = 0
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        # Ids in the queue, so recovering a job this process already holds doesn't queue it twice
+        self._pending: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def enqueue(self, job_id: str) -> None:
+        if job_id in self._pending:
+            return
+        self._pending.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def recover(self, queued_before: Optional[datetime] = None) -> int:
+        """Queue jobs orphaned by a dead process (or left in its queue); returns how many"""
+        recovered = [job_id for job_id in await recover_jobs(queued_before) if job_id not in self._pending]
+        for job_id in recovered:
+            self.enqueue(job_id)
+        return len(recovered)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        recovered = await self.recover()
+        if recovered:
+            print(f"jobs: re-queued {recovered} pending jobs")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            self.running += 1
+            try:
+                await run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"job {job_id} could not be run: {e}")
+            finally:
+                self.running -= 1
+
+    async def sweep(self) -> None:
+        # Another process may have died since startup: its running jobs go stale, and the
+        # jobs still waiting in its queue stay queued, both holding their owner's job slots
+        stale = datetime.utcnow() - timedelta(seconds=settings.JOBS_STALE_AFTER_SECONDS)
+        recovered = await self.recover(queued_before=stale)
+        if recovered:
+            print(f"jobs: re-queued {recovered} orphaned jobs")
+        deleted = await purge_expired_jobs()
+        if deleted:
+            print(f"jobs: deleted {deleted} expired jobs")
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval_seconds)
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"job sweep failed: {e}")
+
+
+job_workers = JobWorkerPool(settings.JOBS_WORKERS, settings.JOBS_CLEANUP_INTERVAL_SECONDS)
+
+jobs_finished = Counter("jobs_finished_total", "Generation jobs finished, by kind and status", ("kind", "status"))
+jobs_pending = Gauge(
+    "jobs_pending",
+    "Generation jobs waiting for or held by a worker in this process",
+    ("state",),
+    collect=lambda: {("queued",): job_workers.queued, ("running",): job_workers.running}
+)
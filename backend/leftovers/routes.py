@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from sqlmodel import select
+from typing import List, Optional
 
 from db.main import get_session
+from db.query_budget import query_budget
+from responses import model_response
 from auth.service import get_current_user
-from db.models import User,UserTasteProfile
+from db.models import User
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from jobs.routes import JOB_RESPONSES, job_accepted
+from ratelimit import enforce_rate_limit
 from leftovers.schemas import (
     LeftoverIngredientBase,
     LeftoverIngredientResponse,
@@ -13,7 +17,8 @@ from leftovers.schemas import (
     TransformationSuggestion,
     SavedTransformationResponse,
     SaveTransformationRequest,
-    
+    SavedTransformationPage,
+    SavedTransformationSearchPage,
 )
 from leftovers.service import (
     leftover_service,
@@ -22,6 +27,8 @@ from leftovers.service import (
     delete_leftover_ingredient,
     save_transformation,
     get_saved_transformations,
+    get_saved_transformation_summaries,
+    search_saved_transformations,
     get_saved_transformation_by_id,
     delete_saved_transformation
 )
@@ -34,7 +41,7 @@ async def get_user_leftover_ingredients(
     session: AsyncSession = Depends(get_session)
 ):
     leftovers = await get_leftover_ingredients(session, current_user.id)
-    return leftovers
+    return model_response(List[LeftoverIngredientResponse], leftovers)
 
 @router.post("/ingredients", response_model=LeftoverIngredientResponse)
 async def add_new_leftover_ingredient(
@@ -46,33 +53,22 @@ async def add_new_leftover_ingredient(
     return leftover
 
 
-@router.post("/transform", response_model=List[TransformationSuggestion])
+@router.post("/transform", response_model=List[TransformationSuggestion], responses=JOB_RESPONSES)
+@query_budget(5)
 async def transform_leftovers(
     request: LeftoverTransformRequest,
+    job: bool = Query(False, description="Run in the background and return 202 with a job to poll"),
+    idempotency_key: Optional[str] = Header(None, max_length=128),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    # Get user taste profile
-    result = await session.execute(
-        select(UserTasteProfile).where(UserTasteProfile.user_id == current_user.id)
-    )
-    taste_profile = result.scalar_one_or_none()
-    
-    # Get leftover ingredients
-    leftover_ingredients = await get_leftover_ingredients(session, current_user.id)
-    ingredient_names = [item.ingredient_name for item in leftover_ingredients]
-    
-    if not ingredient_names:
-        raise HTTPException(status_code=400, detail="No leftover ingredients found")
-    
-    # Pass taste_profile to the service
-    transformations = await leftover_service.transform_leftovers(
-        leftover_ingredients=ingredient_names,
-        taste_profile=taste_profile,  # Add this line
-        language=request.language
-    )
-    
-    return transformations
+    if job:
+        return await job_accepted(session, current_user.id, "transformation", request, idempotency_key, rate_limit_scope="transform")
+    enforce_rate_limit(current_user.id, "transform")
+    try:
+        return await leftover_service.transform_user_leftovers(session, current_user.id, request.language)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/save-transformation", response_model=SavedTransformationResponse)
 async def save_transformation_idea(
@@ -96,7 +92,32 @@ async def get_user_saved_transformations(
     session: AsyncSession = Depends(get_session)
 ):
     transformations = await get_saved_transformations(session, current_user.id)
-    return transformations
+    return model_response(List[SavedTransformationResponse], transformations)
+
+@router.get("/saved-transformations/summary", response_model=SavedTransformationPage)
+async def get_user_saved_transformation_summaries(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    try:
+        page = await get_saved_transformation_summaries(session, current_user.id, cursor, limit)
+    except ValueError as e:
+        # A malformed cursor; serialization errors below are ours, not the client's
+        raise HTTPException(status_code=400, detail=str(e))
+    return model_response(SavedTransformationPage, page)
+
+@router.get("/saved-transformations/search", response_model=SavedTransformationSearchPage)
+async def search_user_saved_transformations(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    page = await search_saved_transformations(session, current_user.id, q, limit, offset)
+    return model_response(SavedTransformationSearchPage, page)
 
 @router.get("/saved-transformations/{transformation_id}", response_model=SavedTransformationResponse)
 async def get_saved_transformation(
@@ -40,6 +40,30 @@ class SavedTransformationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SavedTransformationSummary(BaseModel):
+    id: int
+    title: str
+    description: str
+    used_leftovers: List[str]
+    cooking_time: int
+    difficulty: str
+    language: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class SavedTransformationPage(BaseModel):
+    items: List[SavedTransformationSummary]
+    next_cursor: Optional[str] = None
+
+class SavedTransformationSearchResult(SavedTransformationSummary):
+    rank: float
+
+class SavedTransformationSearchPage(BaseModel):
+    items: List[SavedTransformationSearchResult]
+    next_offset: Optional[int] = None
+
 class SaveTransformationRequest(BaseModel):
     title: str
     description: str
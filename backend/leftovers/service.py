@@ -1,33 +1,121 @@
-import json
-import google.generativeai as genai
+import time
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any,Optional
+from typing import List, Dict, Any,Optional, Sequence
 
 from db.models import LeftoverIngredient, LeftoverTransformation,UserTasteProfile
-from leftovers.schemas import LeftoverIngredientBase, SaveTransformationRequest
+from leftovers.schemas import LeftoverIngredientBase, SaveTransformationRequest, TransformationSuggestion
+from llm.client import llm_client
+from llm.cache import normalize_text, profile_fingerprint
+from ingredients.normalizer import IngredientMatcher, canonical_set, dedupe
+from llm.singleflight import generation_flights
+from llm.parsing import generate_items
+from llm.prompts import compact_prompt, output_instructions
+from db.pagination import keyset_paginate, build_page
+from db.search import full_text_search, saved_transformations_search
+from dashboard.service import bump_user_stats, record_generation
+from metrics import timed
+from pantry.expiry import get_expiring_items, expiring_names
+
+TRANSFORMATION_COUNT = 3
+
+TRANSFORMATION_JSON_EXAMPLE = """{
+    "transformations": [{
+        "title": "Creative Recipe Name",
+        "description": "Brief description of the transformed dish",
+        "transformation_idea": "Detailed step-by-step cooking instructions for transforming the leftovers",
+        "used_leftovers": ["leftover1", "leftover2"],
+        "additional_ingredients": ["ingredient1", "ingredient2"],
+        "cooking_time": 25,
+        "difficulty": "Easy"
+    }]
+}"""
 
 class LeftoverService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.llm = llm_client
  
     async def transform_leftovers(
     self,
     leftover_ingredients: List[str],
     taste_profile: UserTasteProfile = None,  # Add taste profile parameter
-    language: str = "en"
+    language: str = "en",
+    user_id: Optional[int] = None,
+    expiring: Sequence[str] = ()
 ) -> List[Dict[str, Any]]:
     
-        prompt = self._build_transformation_prompt(leftover_ingredients, taste_profile, language)
+        # Duplicate in-flight requests (double clicks, client retries) share one LLM call
+        flight_key = (
+            user_id,
+            "transform",
+            tuple(sorted(canonical_set(leftover_ingredients))),
+            normalize_text(language),
+            profile_fingerprint(taste_profile),
+            tuple(sorted(canonical_set(expiring)))
+        )
+        return await generation_flights.do(
+            flight_key,
+            lambda: self._generate_transformations(leftover_ingredients, taste_profile, language, user_id, expiring)
+        )
+
+    async def transform_user_leftovers(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        language: str = "en"
+    ) -> List[Dict[str, Any]]:
+        """Transformations for everything in the user's leftovers, with their taste profile"""
+        result = await session.execute(
+            select(UserTasteProfile).where(UserTasteProfile.user_id == user_id)
+        )
+        taste_profile = result.scalar_one_or_none()
+
+        leftover_ingredients = await get_leftover_ingredients(session, user_id)
+        ingredient_names = dedupe(item.ingredient_name for item in leftover_ingredients)
+
+        if not ingredient_names:
+            raise ValueError("No leftover ingredients found")
+
+        return await self.transform_leftovers(
+            leftover_ingredients=ingredient_names,
+            taste_profile=taste_profile,
+            language=language,
+            user_id=user_id,
+            expiring=expiring_names(await get_expiring_items(session, user_id))
+        )
+
+    async def _generate_transformations(
+        self,
+        leftover_ingredients: List[str],
+        taste_profile: Optional[UserTasteProfile],
+        language: str,
+        user_id: Optional[int] = None,
+        expiring: Sequence[str] = ()
+    ) -> List[Dict[str, Any]]:
+        prompt = self._build_transformation_prompt(leftover_ingredients, taste_profile, language, expiring)
         
+        llm_started = time.perf_counter()
         try:
-            response = self.model.generate_content(prompt)
-            transformations = self._parse_transformation_response(response.text)
-            return transformations
+            # Fewer than TRANSFORMATION_COUNT usable ideas is still a useful answer; a truncated
+            # reply keeps its complete ideas and only the missing ones are requested again
+            transformations = await generate_items(
+                self.llm.generate, prompt, "transformations", TransformationSuggestion,
+                TRANSFORMATION_COUNT, "transformation"
+            )
         except Exception as e:
             raise Exception(f"Error generating transformation ideas: {str(e)}")
+        
+        await record_generation(user_id, "transformation", llm_started=llm_started)
+        return transformations
 
-    def _build_transformation_prompt(self, ingredients: List[str], taste_profile: UserTasteProfile, language: str) -> str:
+    @timed("prompt")
+    def _build_transformation_prompt(
+        self,
+        ingredients: List[str],
+        taste_profile: UserTasteProfile,
+        language: str,
+        expiring: Sequence[str] = ()
+    ) -> str:
         
         # Handle None taste_profile safely
         spice_level = taste_profile.spice_level if taste_profile else 2
@@ -35,9 +123,13 @@ class LeftoverService:
         dietary_preferences = ', '.join(taste_profile.dietary_preferences) if taste_profile and taste_profile.dietary_preferences else 'None'
         likes = ', '.join(taste_profile.likes) if taste_profile and taste_profile.likes else 'None'
         dislikes = ', '.join(taste_profile.dislikes) if taste_profile and taste_profile.dislikes else 'None'
+        exclusions = IngredientMatcher(
+            ((taste_profile.allergies or []) + (taste_profile.dislikes or [])) if taste_profile else []
+        )
+        use_soon = dedupe(exclusions.filter(expiring))
         
         prompt = f"""
-        Suggest 3 creative recipe transformations in {language} that can turn these leftover ingredients into new delicious meals: {', '.join(ingredients)}
+        Suggest {TRANSFORMATION_COUNT} creative recipe transformations in {language} that can turn these leftover ingredients into new delicious meals: {', '.join(ingredients)}
         
         Consider user preferences:
         - Spice level: {spice_level}/5
@@ -46,6 +138,8 @@ class LeftoverService:
         - Likes: {likes}
         - Dislikes: {dislikes}
         
+        Pantry items expiring soon (good additional ingredients): {', '.join(use_soon) if use_soon else 'None'}
+        
         Focus on:
         - Creative ways to reuse leftovers while respecting user preferences
         - Reducing food waste
@@ -60,49 +154,10 @@ class LeftoverService:
         6. Cooking time in minutes
         7. Difficulty level (Easy/Medium/Hard)
         
-        Return in this exact JSON format:
-        {{
-            "transformations": [
-                {{
-                    "title": "Creative Recipe Name",
-                    "description": "Brief description of the transformed dish",
-                    "transformation_idea": "Detailed step-by-step cooking instructions for transforming the leftovers",
-                    "used_leftovers": ["leftover1", "leftover2"],
-                    "additional_ingredients": ["ingredient1", "ingredient2"],
-                    "cooking_time": 25,
-                    "difficulty": "Easy"
-                }}
-            ]
-        }}
-        
-        Make sure the response is valid JSON and contains exactly 3 transformations.
         Ensure all suggestions respect the user's dietary preferences and taste preferences.
+        {output_instructions(TRANSFORMATION_JSON_EXAMPLE)}
         """
-        return prompt
-        
-    def _parse_transformation_response(self, response_text: str) -> List[Dict[str, Any]]:
-        try:
-            # Clean the response text
-            cleaned_text = response_text.strip()
-            if '```json' in cleaned_text:
-                cleaned_text = cleaned_text.split('```json')[1].split('```')[0]
-            elif '```' in cleaned_text:
-                cleaned_text = cleaned_text.split('```')[1]
-            
-            start = cleaned_text.find('{')
-            end = cleaned_text.rfind('}') + 1
-            json_str = cleaned_text[start:end]
-            
-            data = json.loads(json_str)
-            transformations = data.get("transformations", [])
-            
-            # Validate we have exactly 3 transformations
-            if len(transformations) != 3:
-                raise Exception(f"Expected 3 transformations, got {len(transformations)}")
-                
-            return transformations
-        except Exception as e:
-            raise Exception(f"Failed to parse transformation response: {str(e)}\nResponse was: {response_text}")
+        return compact_prompt(prompt)
 
 # Create global instance
 leftover_service = LeftoverService()
@@ -129,8 +184,8 @@ async def add_leftover_ingredient(
     )
     
     session.add(leftover)
+    await bump_user_stats(session, user_id, leftover_items_count=1)
     await session.commit()
-    await session.refresh(leftover)
     return leftover
 
 async def delete_leftover_ingredient(
@@ -151,6 +206,7 @@ async def delete_leftover_ingredient(
         return False
     
     await session.delete(leftover)
+    await bump_user_stats(session, user_id, leftover_items_count=-1)
     await session.commit()
     return True
 
@@ -166,8 +222,8 @@ async def save_transformation(
     )
     
     session.add(transformation)
+    await bump_user_stats(session, user_id, saved_transformations_count=1)
     await session.commit()
-    await session.refresh(transformation)
     return transformation
 
 async def get_saved_transformations(
@@ -182,6 +238,52 @@ async def get_saved_transformations(
     )
     return result.scalars().all()
 
+async def get_saved_transformation_summaries(
+    session: AsyncSession,
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """One page of saved transformations, newest first, without the long transformation text"""
+    query = select(
+        LeftoverTransformation.id,
+        LeftoverTransformation.title,
+        LeftoverTransformation.description,
+        LeftoverTransformation.used_leftovers,
+        LeftoverTransformation.cooking_time,
+        LeftoverTransformation.difficulty,
+        LeftoverTransformation.language,
+        LeftoverTransformation.created_at
+    ).where(LeftoverTransformation.user_id == user_id)
+    
+    result = await session.execute(
+        keyset_paginate(query, LeftoverTransformation.created_at, LeftoverTransformation.id, cursor, limit)
+    )
+    items, next_cursor = build_page(result.all(), limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+async def search_saved_transformations(
+    session: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """Saved transformations matching query in title, leftovers, ingredients or text, best match first"""
+    table = LeftoverTransformation.__table__
+    rows = await full_text_search(
+        session,
+        saved_transformations_search,
+        [table.c.id, table.c.title, table.c.description, table.c.used_leftovers, table.c.cooking_time,
+         table.c.difficulty, table.c.language, table.c.created_at],
+        user_id,
+        query,
+        limit + 1,
+        offset
+    )
+    next_offset = offset + limit if len(rows) > limit else None
+    return {"items": rows[:limit], "next_offset": next_offset}
+
 async def get_saved_transformation_by_id(
     session: AsyncSession,
     transformation_id: int,
@@ -214,5 +316,6 @@ async def delete_saved_transformation(
         return False
     
     await session.delete(transformation)
+    await bump_user_stats(session, user_id, saved_transformations_count=-1)
     await session.commit()
     return True
\ No newline at end of file
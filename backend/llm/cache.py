@@ -0,0 +1,75 @@
+import copy
+import hashlib
+import json
+import re
+from typing import Any, Dict, Hashable, Optional
+
+from cachetools import TTLCache
+
+from db.models import UserTasteProfile
+from ingredients.normalizer import canonical_set
+from metrics import record_cache_lookup
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace/punctuation so near-identical inputs share a key"""
+    text = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def profile_fingerprint(taste_profile: Optional[UserTasteProfile]) -> str:
+    """Stable hash of the taste profile fields that end up in generation prompts"""
+    if not taste_profile:
+        return "none"
+
+    def _ingredients(values):
+        return sorted(canonical_set(values))
+
+    data = {
+        "likes": _ingredients(taste_profile.likes),
+        "dislikes": _ingredients(taste_profile.dislikes),
+        "allergies": _ingredients(taste_profile.allergies),
+        "dietary": sorted({normalize_text(v) for v in taste_profile.dietary_preferences or [] if v}),
+        "spice": taste_profile.spice_level,
+        "oil": taste_profile.oil_preference,
+        "time": taste_profile.cooking_time_preference,
+    }
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache for parsed LLM responses with hit/miss counters"""
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "response"):
+        self.name = name
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._cache.get(key)
+        record_cache_lookup(self.name, value is not None)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Callers get their own copy so they can't mutate the cached entry
+        return copy.deepcopy(value)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._cache[key] = copy.deepcopy(value)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
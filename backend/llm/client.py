@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from config import settings
+from llm.providers import LLMProvider, create_provider
+from llm.scheduler import FairScheduler
+from metrics import Gauge, Histogram, record_phase
+
+llm_request_duration = Histogram(
+    "llm_request_duration_seconds", "LLM call latency, excluding time queued", ("provider", "method", "outcome")
+)
+
+
+class LLMTimeoutError(Exception):
+    pass
+
+
+class LLMClient:
+    """Shared async LLM client.
+
+    Replies come from an LLMProvider (Gemini unless LLM_PROVIDER says
+    otherwise). A FairScheduler caps how many generations are in flight at the
+    same time; callers beyond the limit wait without blocking the event loop,
+    and freed slots are shared fairly between the users waiting for one.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[LLMProvider] = None,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        timeout: float = settings.LLM_TIMEOUT_SECONDS
+    ):
+        self.provider = provider or create_provider()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        self.scheduler = FairScheduler(max_concurrency)
+
+    async def generate(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Generate text; with response_schema the reply is JSON constrained to that schema"""
+        timeout = timeout or self.timeout
+        queued = time.perf_counter()
+        async with self.scheduler.slot():
+            started = time.perf_counter()
+            record_phase("llm_queue", started - queued)
+            self.in_flight += 1
+            outcome = "error"
+            try:
+                text = await asyncio.wait_for(
+                    self.provider.generate(prompt, response_schema, timeout),
+                    timeout=timeout
+                )
+                outcome = "ok"
+                return text
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise LLMTimeoutError(f"LLM call timed out after {timeout}s")
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            finally:
+                self.in_flight -= 1
+                self._observe("generate", outcome, started)
+
+    async def stream(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Yield text chunks as the model produces them; timeout covers the whole stream"""
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        queued = time.perf_counter()
+        async with self.scheduler.slot():
+            started = time.perf_counter()
+            record_phase("llm_queue", started - queued)
+            self.in_flight += 1
+            outcome = "error"
+            chunks = self.provider.stream(prompt, response_schema, timeout).__aiter__()
+            try:
+                deadline = loop.time() + timeout
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), deadline - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise LLMTimeoutError(f"LLM stream timed out after {timeout}s")
+            except (asyncio.CancelledError, GeneratorExit):
+                # Client went away mid-stream
+                outcome = "cancelled"
+                raise
+            finally:
+                await chunks.aclose()
+                self.in_flight -= 1
+                self._observe("stream", outcome, started)
+
+    def _observe(self, method: str, outcome: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        record_phase("llm", elapsed)
+        llm_request_duration.observe(elapsed, self.provider.name, method, outcome)
+
+
+# Create global instance
+llm_client = LLMClient()
+
+llm_in_flight = Gauge("llm_in_flight", "LLM calls currently running", collect=lambda: {(): llm_client.in_flight})
+llm_queued = Gauge(
+    "llm_queued",
+    "LLM calls waiting for a slot, and the number of users they belong to",
+    ("count",),
+    collect=lambda: {("calls",): llm_client.scheduler.queued, ("users",): llm_client.scheduler.queued_tenants}
+)
@@ -0,0 +1,231 @@
+import json
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from llm.schemas import list_schema
+from metrics import Counter, timed
+
+CLOSERS = {"{": "}", "[": "]"}
+_decoder = json.JSONDecoder(strict=False)
+
+
+class ParseResult:
+    """Decoded JSON plus how much fixing it needed: "clean", "repaired" or "truncated" """
+
+    def __init__(self, data: Any, status: str):
+        self.data = data
+        self.status = status
+
+    @property
+    def truncated(self) -> bool:
+        return self.status == "truncated"
+
+
+class ParseStats:
+    """Per-kind parse outcomes, exported on /health/llm"""
+
+    OUTCOMES = ("clean", "repaired", "truncated", "failed", "items_dropped", "remainder_requests")
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(self.OUTCOMES, 0))
+
+    def record(self, kind: str, outcome: str, amount: int = 1) -> None:
+        self._counts[kind][outcome] += amount
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for kind, counts in self._counts.items():
+            responses = counts["clean"] + counts["repaired"] + counts["truncated"] + counts["failed"]
+            result[kind] = {
+                **counts,
+                "repair_rate": counts["repaired"] / responses if responses else 0.0,
+                "salvage_rate": counts["truncated"] / responses if responses else 0.0,
+                "failure_rate": counts["failed"] / responses if responses else 0.0,
+            }
+        return result
+
+
+parse_stats = ParseStats()
+
+llm_parse_results = Counter(
+    "llm_parse_results_total",
+    "Model replies and items by parse outcome",
+    ("kind", "outcome"),
+    collect=lambda: {
+        (kind, outcome): count
+        for kind, counts in parse_stats._counts.items()
+        for outcome, count in counts.items()
+    }
+)
+
+
+def _strip_wrapping(text: str) -> str:
+    """Drop ``` fences and prose before the JSON; whatever follows it is ignored by raw_decode"""
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return text[min(starts):] if starts else text
+
+
+def _strip_trailing_commas(text: str) -> str:
+    out = []
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in ("}", "]"):
+                continue
+        out.append(ch)
+    return "".join(out)
+
+
+def _close_truncated(text: str) -> Optional[str]:
+    """Cut back to the last complete element and close every open container.
+
+    Cuts only happen between elements of an array or between fields of the
+    top-level object, so an item that was still being written when the output
+    stopped is dropped whole instead of coming back half-filled.
+    """
+    stack: List[str] = []
+    in_string = escape = False
+    safe: Optional[Tuple[int, Tuple[str, ...]]] = None
+
+    def can_cut() -> bool:
+        # Anywhere below an object other than the root would leave that object partial
+        return all(container == "[" for container in stack[1:])
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(ch)
+            if len(stack) == 1:
+                safe = (i + 1, tuple(stack))
+        elif ch in ("}", "]"):
+            if not stack:
+                return None
+            stack.pop()
+            if not stack:
+                return text[:i + 1]
+            if can_cut():
+                safe = (i + 1, tuple(stack))
+        elif ch == "," and stack and can_cut():
+            safe = (i, tuple(stack))
+    if safe is None:
+        return None
+    cut, open_containers = safe
+    return text[:cut] + "".join(CLOSERS[ch] for ch in reversed(open_containers))
+
+
+@timed("parse")
+def parse_json(text: str, kind: str = "unknown") -> ParseResult:
+    """Decode a model reply, repairing the defects LLMs commonly produce.
+
+    Tries, in order: the reply as-is; the JSON inside fences/prose with trailing
+    commas removed (control characters inside strings are tolerated); and
+    finally, for output cut off mid-way, everything up to the last complete
+    element. Raises ValueError when nothing usable is left.
+    """
+    try:
+        result = ParseResult(json.loads(text), "clean")
+    except ValueError:
+        result = None
+
+    if result is None:
+        candidate = _strip_trailing_commas(_strip_wrapping(text))
+        try:
+            result = ParseResult(_decoder.raw_decode(candidate)[0], "repaired")
+        except ValueError:
+            closed = _close_truncated(candidate)
+            try:
+                if closed is None:
+                    raise ValueError("No JSON value in model response")
+                result = ParseResult(_decoder.raw_decode(_strip_trailing_commas(closed))[0], "truncated")
+            except ValueError:
+                parse_stats.record(kind, "failed")
+                raise ValueError("Model response is not valid JSON and could not be repaired")
+
+    parse_stats.record(kind, result.status)
+    return result
+
+
+def loads_json(text: str, kind: str = "unknown") -> Any:
+    return parse_json(text, kind).data
+
+
+def validated_items(items: Any, model: Type[BaseModel], limit: int) -> List[Dict[str, Any]]:
+    """Keep up to limit items that validate against model, dropping malformed ones"""
+    if not isinstance(items, list):
+        return []
+    valid = []
+    for item in items:
+        try:
+            valid.append(model.model_validate(item).model_dump())
+        except ValidationError:
+            continue
+        if len(valid) == limit:
+            break
+    return valid
+
+
+async def generate_items(
+    generate: Callable[..., Awaitable[str]],
+    prompt: str,
+    key: str,
+    model: Type[BaseModel],
+    count: int,
+    kind: str
+) -> List[Dict[str, Any]]:
+    """Ask for {key: [count x model]}, keeping every complete item from a damaged reply.
+
+    If the reply was truncated or had invalid items, only the missing remainder
+    is requested in a second, smaller call, instead of regenerating everything.
+    Raises ValueError only when not a single valid item could be obtained.
+    """
+    result = parse_json(await generate(prompt, response_schema=list_schema(key, model, 1, count)), kind)
+    raw_items = result.data.get(key) if isinstance(result.data, dict) else None
+    items = validated_items(raw_items, model, count)
+    dropped = len(raw_items) - len(items) if isinstance(raw_items, list) and len(raw_items) <= count else 0
+    if dropped:
+        parse_stats.record(kind, "items_dropped", dropped)
+
+    missing = count - len(items)
+    if missing and (result.truncated or dropped):
+        parse_stats.record(kind, "remainder_requests")
+        titles = ", ".join(item.get("title", "") for item in items)
+        remainder_prompt = (
+            f"{prompt}\n"
+            f"Already suggested: {titles or 'nothing'}. "
+            f"Return only {missing} more, different from those."
+        )
+        try:
+            remainder = parse_json(
+                await generate(remainder_prompt, response_schema=list_schema(key, model, 1, missing)),
+                kind
+            )
+            if isinstance(remainder.data, dict):
+                items += validated_items(remainder.data.get(key), model, missing)
+        except Exception as e:
+            # What we already have is still worth returning
+            print(f"Remainder request for {kind} failed: {e}")
+
+    if not items:
+        raise ValueError(f"No valid {key} in model response")
+    return items
@@ -0,0 +1,13 @@
+from config import settings
+
+
+def compact_prompt(prompt: str) -> str:
+    """Drop the source indentation and blank lines; they are tokens the model doesn't need"""
+    return "\n".join(line.strip() for line in prompt.splitlines() if line.strip())
+
+
+def output_instructions(example: str) -> str:
+    """The JSON shape only has to be spelled out when the response schema isn't sent"""
+    if settings.LLM_STRUCTURED_OUTPUT:
+        return ""
+    return f"Return only JSON in this exact format:\n{example}"
@@ -0,0 +1,304 @@
+"""LLM providers behind LLMClient.
+
+LLMClient owns concurrency limits, timeouts and bookkeeping; a provider only
+turns a prompt into text. LLM_PROVIDER selects one of:
+
+- "gemini": the real API
+- "stub": deterministic offline replies synthesized from the response schema,
+  with configurable latency and error injection, for load tests and benchmarks
+- "record": calls Gemini and stores every reply under LLM_RECORDINGS_DIR
+- "replay": serves stored replies (with their recorded timing) and never
+  touches the network; a prompt that was never recorded is an error
+"""
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import google.generativeai as genai
+
+from config import settings
+
+STUB_WORDS = (
+    "rice", "tomato", "basil", "garlic", "lentil", "chickpea", "spinach", "lemon",
+    "ginger", "onion", "pepper", "mushroom", "potato", "carrot", "yogurt", "cumin",
+)
+
+
+class LLMProviderError(Exception):
+    pass
+
+
+class LLMProvider(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    async def generate(self, prompt: str, response_schema: Optional[Dict[str, Any]], timeout: float) -> str:
+        ...
+
+    @abc.abstractmethod
+    def stream(
+        self,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]],
+        timeout: float
+    ) -> AsyncIterator[str]:
+        """An async generator of text chunks"""
+
+
+class GeminiProvider(LLMProvider):
+    """A single GenerativeModel is reused for every call so the async gRPC channel is opened once"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = settings.LLM_MODEL_NAME):
+        self.model_name = model_name
+        self._model: Optional[genai.GenerativeModel] = None
+
+    @property
+    def model(self) -> genai.GenerativeModel:
+        # Created lazily so genai.configure() in the lifespan hook runs first
+        if self._model is None:
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def _generation_config(self, response_schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if response_schema is None or not settings.LLM_STRUCTURED_OUTPUT:
+            return None
+        return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+    async def generate(self, prompt: str, response_schema: Optional[Dict[str, Any]], timeout: float) -> str:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=self._generation_config(response_schema),
+            request_options={"timeout": timeout}
+        )
+        return response.text
+
+    async def stream(
+        self,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]],
+        timeout: float
+    ) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=self._generation_config(response_schema),
+            stream=True,
+            request_options={"timeout": timeout}
+        )
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. the final finish_reason chunk)
+                continue
+            if text:
+                yield text
+
+
+class StubProvider(LLMProvider):
+    """Offline provider whose replies depend only on the prompt, the schema and the seed.
+
+    Replies are built from the response schema, so they parse and validate like
+    real structured output. Latency is latency_ms +/- jitter_ms; error_rate is
+    the fraction of calls that raise LLMProviderError.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency_ms: float = settings.LLM_STUB_LATENCY_MS,
+        jitter_ms: float = settings.LLM_STUB_JITTER_MS,
+        error_rate: float = settings.LLM_STUB_ERROR_RATE,
+        seed: int = settings.LLM_STUB_SEED,
+        stream_chunks: int = settings.LLM_STUB_STREAM_CHUNKS
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.stream_chunks = max(1, stream_chunks)
+        # Call-order RNG for errors and latency; content comes from a per-prompt RNG
+        self._calls = random.Random(seed)
+
+    def _content_rng(self, prompt: str, response_schema: Optional[Dict[str, Any]]) -> random.Random:
+        key = json.dumps([self.seed, prompt, response_schema], sort_keys=True)
+        return random.Random(hashlib.sha256(key.encode()).hexdigest())
+
+    def _value(self, schema: Dict[str, Any], rng: random.Random, field: str) -> Any:
+        kind = schema.get("type")
+        if kind == "object":
+            return {
+                name: self._value(prop, rng, name)
+                for name, prop in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            count = schema.get("max_items", 3)
+            count = max(count, schema.get("min_items", 0))
+            return [self._value(schema["items"], rng, field) for _ in range(count)]
+        if kind == "integer":
+            return rng.randint(5, 60)
+        if kind == "number":
+            return round(rng.uniform(1, 100), 1)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        if "enum" in schema:
+            return rng.choice(schema["enum"])
+        if field == "difficulty":
+            return rng.choice(("Easy", "Medium", "Hard"))
+        return " ".join(rng.choice(STUB_WORDS) for _ in range(3)).capitalize()
+
+    def reply(self, prompt: str, response_schema: Optional[Dict[str, Any]]) -> str:
+        if response_schema is None:
+            return "Stub response"
+        rng = self._content_rng(prompt, response_schema)
+        return json.dumps(self._value(response_schema, rng, ""))
+
+    def _delay(self) -> float:
+        jitter = self._calls.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _fails(self) -> bool:
+        return bool(self.error_rate) and self._calls.random() < self.error_rate
+
+    async def generate(self, prompt: str, response_schema: Optional[Dict[str, Any]], timeout: float) -> str:
+        delay = self._delay()
+        failing = self._fails()
+        # Failed calls still take time, like a real upstream error would
+        await asyncio.sleep(delay)
+        if failing:
+            raise LLMProviderError("Injected stub failure")
+        return self.reply(prompt, response_schema)
+
+    async def stream(
+        self,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]],
+        timeout: float
+    ) -> AsyncIterator[str]:
+        delay = self._delay()
+        if self._fails():
+            await asyncio.sleep(delay)
+            raise LLMProviderError("Injected stub failure")
+        text = self.reply(prompt, response_schema)
+        size = -(-len(text) // self.stream_chunks)
+        for start in range(0, len(text), size):
+            await asyncio.sleep(delay / self.stream_chunks)
+            yield text[start:start + size]
+
+
+class RecordReplayProvider(LLMProvider):
+    """Stores replies from another provider on disk, or serves them back.
+
+    One JSON file per (model, prompt, schema), holding the reply as the chunks
+    it arrived in plus the delay before each chunk, so replayed streams keep
+    their shape and timing. latency_scale stretches or shrinks replayed delays;
+    0 replays as fast as possible.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        directory: str = settings.LLM_RECORDINGS_DIR,
+        inner: Optional[LLMProvider] = None,
+        model_name: str = settings.LLM_MODEL_NAME,
+        latency_scale: float = settings.LLM_REPLAY_LATENCY_SCALE
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        self.name = mode
+        self.mode = mode
+        self.directory = directory
+        self.inner = inner or GeminiProvider(model_name)
+        self.model_name = model_name
+        self.latency_scale = latency_scale
+
+    def _path(self, prompt: str, response_schema: Optional[Dict[str, Any]]) -> str:
+        key = json.dumps([self.model_name, prompt, response_schema], sort_keys=True)
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _load(self, path: str) -> Dict[str, Any]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise LLMProviderError(f"No recorded response for this prompt ({os.path.basename(path)})")
+
+    def _save(self, path: str, recording: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # Write-then-rename so concurrent replays never see a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(recording, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    async def _record(
+        self,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]],
+        chunks: List[str],
+        delays: List[float]
+    ) -> None:
+        recording = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "response_schema": response_schema,
+            "chunks": chunks,
+            "delays": delays,
+        }
+        await asyncio.to_thread(self._save, self._path(prompt, response_schema), recording)
+
+    async def generate(self, prompt: str, response_schema: Optional[Dict[str, Any]], timeout: float) -> str:
+        if self.mode == "replay":
+            recording = await asyncio.to_thread(self._load, self._path(prompt, response_schema))
+            await asyncio.sleep(sum(recording["delays"]) * self.latency_scale)
+            return "".join(recording["chunks"])
+
+        started = time.perf_counter()
+        text = await self.inner.generate(prompt, response_schema, timeout)
+        await self._record(prompt, response_schema, [text], [time.perf_counter() - started])
+        return text
+
+    async def stream(
+        self,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]],
+        timeout: float
+    ) -> AsyncIterator[str]:
+        if self.mode == "replay":
+            recording = await asyncio.to_thread(self._load, self._path(prompt, response_schema))
+            delays = recording["delays"]
+            if len(delays) != len(recording["chunks"]):
+                # Recorded via generate(): spread the total time over the chunks
+                delays = [sum(delays) / len(recording["chunks"])] * len(recording["chunks"])
+            for chunk, delay in zip(recording["chunks"], delays):
+                await asyncio.sleep(delay * self.latency_scale)
+                yield chunk
+            return
+
+        chunks: List[str] = []
+        delays: List[float] = []
+        last = time.perf_counter()
+        async for chunk in self.inner.stream(prompt, response_schema, timeout):
+            now = time.perf_counter()
+            chunks.append(chunk)
+            delays.append(now - last)
+            last = now
+            yield chunk
+        await self._record(prompt, response_schema, chunks, delays)
+
+
+def create_provider(name: str = settings.LLM_PROVIDER) -> LLMProvider:
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "stub":
+        return StubProvider()
+    if name in ("record", "replay"):
+        return RecordReplayProvider(name)
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
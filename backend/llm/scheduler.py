@@ -0,0 +1,102 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, Hashable, Optional
+
+# Who the LLM calls made by the current task are for; calls without one share a queue
+_current_tenant: ContextVar[Optional[Hashable]] = ContextVar("llm_tenant", default=None)
+
+
+def schedule_as(tenant: Hashable) -> None:
+    """Queue the current task's LLM calls (and those of tasks it starts) as tenant's"""
+    _current_tenant.set(tenant)
+
+
+class FairScheduler:
+    """Concurrency limit for LLM calls that shares the slots fairly between tenants.
+
+    With a slot free nobody waits, exactly like a semaphore. Once calls are
+    queued, each freed slot goes to the waiting tenant with the fewest calls
+    already running (the least recently served on a tie), so a user with many
+    calls in the queue waits behind their own calls instead of everyone else's.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._running: Dict[Hashable, int] = {}
+        self._waiting: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiting.values())
+
+    @property
+    def queued_tenants(self) -> int:
+        return len(self._waiting)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        tenant = _current_tenant.get()
+        await self._acquire(tenant)
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    async def _acquire(self, tenant: Optional[Hashable]) -> None:
+        if self.in_flight < self.max_concurrency and not self._waiting:
+            self._grant(tenant)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(tenant, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we were cancelled; pass it on
+                self._release(tenant)
+            else:
+                self._forget(tenant, waiter)
+            raise
+
+    def _forget(self, tenant: Optional[Hashable], waiter: asyncio.Future) -> None:
+        waiters = self._waiting.get(tenant)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiting[tenant]
+
+    def _grant(self, tenant: Optional[Hashable]) -> None:
+        self.in_flight += 1
+        self._running[tenant] = self._running.get(tenant, 0) + 1
+
+    def _release(self, tenant: Optional[Hashable]) -> None:
+        self.in_flight -= 1
+        running = self._running[tenant] - 1
+        if running:
+            self._running[tenant] = running
+        else:
+            del self._running[tenant]
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiting and self.in_flight < self.max_concurrency:
+            # min() keeps the first of equals, and served tenants move to the end
+            tenant = min(self._waiting, key=lambda t: self._running.get(t, 0))
+            waiters = self._waiting[tenant]
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(tenant)
+            else:
+                del self._waiting[tenant]
+            if waiter.done():
+                continue
+            self._grant(tenant)
+            waiter.set_result(None)
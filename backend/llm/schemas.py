@@ -0,0 +1,57 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _convert(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+
+    if "anyOf" in node:
+        # Optional[X] comes out as anyOf [X, null]; Gemini spells that "nullable"
+        variants = [variant for variant in node["anyOf"] if variant.get("type") != "null"]
+        converted = _convert(variants[0], defs)
+        if len(variants) < len(node["anyOf"]):
+            converted["nullable"] = True
+        return converted
+
+    converted: Dict[str, Any] = {"type": node["type"]}
+    for key in ("description", "enum"):
+        if key in node:
+            converted[key] = node[key]
+    if node["type"] == "object":
+        properties = node.get("properties", {})
+        converted["properties"] = {name: _convert(prop, defs) for name, prop in properties.items()}
+        # Ask for every field; fields with defaults are still wanted in generated output
+        converted["required"] = list(properties)
+    elif node["type"] == "array":
+        converted["items"] = _convert(node["items"], defs)
+    return converted
+
+
+@lru_cache(maxsize=None)
+def model_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Gemini response_schema for a pydantic model.
+
+    Gemini accepts a subset of OpenAPI: no $ref, title or default, and
+    nullable instead of anyOf-with-null, so the pydantic JSON schema is
+    inlined and trimmed down to that subset.
+    """
+    schema = model.model_json_schema()
+    return _convert(schema, schema.get("$defs", {}))
+
+
+def list_schema(
+    key: str,
+    model: Type[BaseModel],
+    min_items: Optional[int] = None,
+    max_items: Optional[int] = None
+) -> Dict[str, Any]:
+    """Schema for {key: [model, ...]}, the envelope the prompts already ask for"""
+    items: Dict[str, Any] = {"type": "array", "items": model_schema(model)}
+    if min_items is not None:
+        items["min_items"] = min_items
+    if max_items is not None:
+        items["max_items"] = max_items
+    return {"type": "object", "properties": {key: items}, "required": [key]}
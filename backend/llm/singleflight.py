@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from metrics import Counter
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one underlying call.
+
+    The first caller starts the work as a task; duplicates that arrive while
+    it is running await the same task and receive the same result (or
+    exception). The task is shielded, so one caller disconnecting does not
+    cancel the work for the others; it is cancelled once every caller waiting
+    on it has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            waiters = self._waiters.pop(task) - 1
+            if waiters:
+                self._waiters[task] = waiters
+            elif not task.done():
+                # Nobody is left to use the result
+                task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+# Shared by every LLM-backed generation endpoint
+generation_flights = SingleFlight()
+
+generation_flight_calls = Counter(
+    "llm_generation_flights_total",
+    "Generation requests that started an LLM call vs joined one already in flight",
+    ("result",),
+    collect=lambda: {("started",): generation_flights.started, ("shared",): generation_flights.shared}
+)
@@ -3,8 +3,9 @@ from fastapi import FastAPI,Depends
 from sqlmodel import Session
 import google.generativeai as genai
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 
-from db.main import create_db_and_tables
+from db.migrations import check_schema_version
 from  config import settings
 from auth.routes import router as auth_router
 from users.routes import router as users_router
@@ -12,26 +13,47 @@ from recipes.routes import router as recipes_router
 from pantry.routes import router as pantry_router
 from leftovers.routes import router as leftovers_router
 from dashboard.routes import router as dashboard_router
-from db.main import get_session
+from jobs.routes import router as jobs_router
+from db.main import async_engine, get_session, get_pool_stats
+from auth.service import password_hasher
+from pantry.expiry import expiry_sweeper
+from jobs.service import job_workers
+from llm.client import llm_client
+from llm.parsing import parse_stats
+from metrics import CONTENT_TYPE, MetricsMiddleware, instrument_engine, registry
+from db.query_budget import QueryBudgetMiddleware, install_query_log
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     #startup
-    print("creating database tables...")
-    await create_db_and_tables()
+    print("checking database schema...")
+    await check_schema_version()
 
-    #configure GEMINI AI
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    print("GEMINI AI configured successfully")
+    #configure GEMINI AI (stub and replay providers never call it)
+    if settings.LLM_PROVIDER in ("gemini", "record"):
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        print("GEMINI AI configured successfully")
+    else:
+        print(f"using offline LLM provider: {settings.LLM_PROVIDER}")
+
+    if settings.PANTRY_EXPIRY_SWEEPER_ENABLED:
+        expiry_sweeper.start()
+
+    if settings.JOBS_ENABLED:
+        await job_workers.start()
 
     yield
     #shutdown
     print("shutting down...")
+    await job_workers.stop()
+    await expiry_sweeper.stop()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
     title="AI Recipe App",
     description="AI-powered recipe generator with personalized recommendations",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 #CORS Middleware
@@ -43,6 +65,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.DB_QUERY_BUDGET_MODE != "off":
+    app.add_middleware(QueryBudgetMiddleware, mode=settings.DB_QUERY_BUDGET_MODE)
+    install_query_log(async_engine)
+
+if settings.METRICS_ENABLED:
+    #Outermost, so the timings include every other middleware
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(async_engine)
+
 #Include routers
 app.include_router(auth_router,prefix="/auth",tags=["Authentication"])
 app.include_router(users_router,prefix="/users",tags=["Users"])
@@ -50,6 +81,7 @@ app.include_router(recipes_router,prefix="/recipes",tags=["Recipes"])
 app.include_router(pantry_router,prefix="/kitchen",tags=["Pantry"])
 app.include_router(leftovers_router,prefix="/remainings",tags=["Leftovers"])
 app.include_router(dashboard_router,prefix="/dboard",tags=["Dashboard"])
+app.include_router(jobs_router,prefix="/jobs",tags=["Jobs"])
 
 @app.get("/")
 async def root():
@@ -57,4 +89,22 @@ async def root():
 
 @app.get("/health")
 async def health_check(session:Session=Depends(get_session)):
-    return {"status": "ok","database":"connected"}
\ No newline at end of file
+    return {"status": "ok","database":"connected"}
+
+@app.get("/health/pool")
+async def pool_stats():
+    return get_pool_stats()
+
+@app.get("/health/llm")
+async def llm_stats():
+    return {
+        "provider": llm_client.provider.name,
+        "in_flight": llm_client.in_flight,
+        "queued": llm_client.scheduler.queued,
+        "parsing": parse_stats.snapshot()
+    }
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,298 @@
+"""In-process metrics with a Prometheus text exposition endpoint.
+
+Counters, gauges and histograms are kept in plain dicts keyed by label values.
+They are only touched from the event loop thread, so no locking is needed.
+Gauges (and counters mirroring stats that already exist elsewhere) can take a
+`collect` callback that is read at scrape time instead of being updated.
+
+MetricsMiddleware times every request per route template, and `phase()` /
+`timed()` add named phases (auth, db, llm, parse, serialize, ...) to the
+request currently being handled. Outside a request, or with METRICS_ENABLED
+off, a phase costs one ContextVar lookup and a cache lookup is not counted.
+"""
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Labels, float]]] = None
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+        self._values: Dict[Labels, float] = {}
+        registry.register(self)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        values = self._collect() if self._collect else self._values
+        for labels, value in values.items():
+            yield self.name, labels, "", value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                yield f"{self.name}_bucket", labels, f'le="{_format_value(bound)}"', cumulative
+            yield f"{self.name}_sum", labels, "", series[-1]
+            yield f"{self.name}_count", labels, "", cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_requests_in_progress = Gauge("http_requests_in_progress", "HTTP requests being handled")
+request_phase_duration = Histogram(
+    "http_request_phase_seconds", "Time spent per phase of a request", ("route", "phase")
+)
+request_db_queries = Histogram(
+    "http_request_db_queries", "Database queries per request", ("method", "route"), buckets=COUNT_BUCKETS
+)
+db_queries = Counter("db_queries_total", "Database statements executed")
+db_query_duration = Histogram("db_query_duration_seconds", "Database statement latency")
+cache_lookups = Counter("cache_lookups_total", "In-process cache lookups", ("cache", "result"))
+
+
+def _cache_hit_ratios() -> Dict[Labels, float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), count in cache_lookups._values.items():
+        hits_and_total = totals.setdefault(cache, [0, 0])
+        hits_and_total[1] += count
+        if result == "hit":
+            hits_and_total[0] += count
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+
+cache_hit_ratio = Gauge("cache_hit_ratio", "Hit ratio per in-process cache since start", ("cache",), collect=_cache_hit_ratios)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    if not settings.METRICS_ENABLED:
+        return
+    cache_lookups.inc(cache, "hit" if hit else "miss")
+
+
+class RequestTimings:
+    __slots__ = ("phases", "db_queries")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.db_queries = 0
+
+    def add(self, phase_name: str, seconds: float) -> None:
+        self.phases[phase_name] = self.phases.get(phase_name, 0.0) + seconds
+
+
+_current_request: ContextVar[Optional[RequestTimings]] = ContextVar("current_request_timings", default=None)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timings = _current_request.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's `name` phase.
+
+    Phases may nest (llm inside a cache miss, db inside auth); each one is
+    timed on its own. Work started by one request and awaited by others, like
+    a coalesced LLM call, is counted for the request that started it.
+    """
+    timings = _current_request.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of phase() for sync and async functions"""
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with phase(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no extra task per request, unlike BaseHTTPMiddleware)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_request.set(timings)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            http_requests_in_progress.dec()
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc(method, route, str(status))
+            http_request_duration.observe(elapsed, method, route)
+            request_db_queries.observe(timings.db_queries, method, route)
+            for phase_name, seconds in timings.phases.items():
+                request_phase_duration.observe(seconds, route, phase_name)
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement, attributing it to the current request's db phase"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        db_queries.inc()
+        db_query_duration.observe(elapsed)
+        timings = _current_request.get()
+        if timings is not None:
+            timings.db_queries += 1
+            timings.add("db", elapsed)
+
+
+def gauge_from(stats: Callable[[], Dict[str, Any]], keys: Sequence[str]) -> Callable[[], Dict[Labels, float]]:
+    """collect callback exposing numeric entries of an existing stats() dict, labelled by key"""
+    def collect() -> Dict[Labels, float]:
+        values = stats()
+        return {(key,): values[key] for key in keys if key in values}
+    return collect
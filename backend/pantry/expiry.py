@@ -0,0 +1,223 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from cachetools import TTLCache
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from config import settings
+from db.main import async_session_factory
+from db.models import PantryItem
+from metrics import record_cache_lookup, timed
+
+EXPIRING_COLUMNS = (
+    PantryItem.id,
+    PantryItem.user_id,
+    PantryItem.ingredient_name,
+    PantryItem.quantity,
+    PantryItem.unit,
+    PantryItem.expiry_date,
+)
+
+
+def expiry_horizon(now: Optional[datetime] = None) -> datetime:
+    # expiry_date is stored naive, like the rest of the app's utcnow() timestamps
+    return (now or datetime.utcnow()) + timedelta(days=settings.PANTRY_EXPIRY_WINDOW_DAYS)
+
+
+def _as_item(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "ingredient_name": row.ingredient_name,
+        "quantity": row.quantity,
+        "unit": row.unit,
+        "expiry_date": row.expiry_date,
+    }
+
+
+class _UserLists(TTLCache):
+    """TTLCache remembering whether it ever had to evict an entry to make room"""
+
+    evicted = False
+
+    def popitem(self):
+        self.evicted = True
+        return super().popitem()
+
+
+class ExpiringItemsIndex:
+    """Per-user lists of pantry items expiring within the window, soonest first.
+
+    The sweeper rebuilds the whole index periodically; pantry writes invalidate a
+    single user, whose list is then recomputed on demand with an indexed query.
+    A list is only trusted for ttl_seconds (one sweep interval): the window moves
+    with the clock, so items drift into it without any pantry write. Until then,
+    users missing from the last sweep have nothing expiring, unless the index
+    had to evict lists to stay within max_users.
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float, timer: Callable[[], float] = time.monotonic):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.timer = timer
+        self._by_user = _UserLists(maxsize=max_users, ttl=ttl_seconds, timer=timer)
+        self._stale: Set[int] = set()
+        self._invalidated_during_sweep: Set[int] = set()
+        self._sweeping = False
+        self._sweep_valid_until: Optional[float] = None
+        self.swept_at: Optional[datetime] = None
+
+    def _sweep_is_current(self) -> bool:
+        return (
+            self._sweep_valid_until is not None
+            and self.timer() < self._sweep_valid_until
+            and not self._by_user.evicted
+        )
+
+    def get(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        items = self._by_user.get(user_id)
+        if items is None and user_id not in self._stale and self._sweep_is_current():
+            return []
+        return items
+
+    def set(self, user_id: int, items: List[Dict[str, Any]]) -> None:
+        self._by_user[user_id] = items
+        self._stale.discard(user_id)
+
+    def invalidate(self, user_id: int) -> None:
+        self._by_user.pop(user_id, None)
+        if self._sweep_is_current():
+            self._stale.add(user_id)
+        if self._sweeping:
+            self._invalidated_during_sweep.add(user_id)
+
+    def begin_sweep(self) -> None:
+        self._sweeping = True
+        self._invalidated_during_sweep = set()
+
+    def finish_sweep(self, by_user: Dict[int, List[Dict[str, Any]]], swept_at: datetime) -> None:
+        # Anything written while the sweep was reading may be missing from its snapshot
+        for user_id in self._invalidated_during_sweep:
+            by_user.pop(user_id, None)
+        lists = _UserLists(maxsize=self.max_users, ttl=self.ttl_seconds, timer=self.timer)
+        lists.update(by_user)
+        self._by_user = lists
+        self._stale = self._invalidated_during_sweep
+        self._sweeping = False
+        self._sweep_valid_until = self.timer() + self.ttl_seconds
+        self.swept_at = swept_at
+
+    def abort_sweep(self) -> None:
+        self._sweeping = False
+
+
+expiring_items_index = ExpiringItemsIndex(
+    settings.PANTRY_EXPIRY_INDEX_MAX_USERS,
+    settings.PANTRY_EXPIRY_SWEEP_INTERVAL_SECONDS
+)
+
+
+@timed("expiring_items")
+async def get_expiring_items(session: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+    items = expiring_items_index.get(user_id)
+    record_cache_lookup("expiring_items", items is not None)
+    if items is None:
+        # Served by ix_pantry_items_user_expiry
+        result = await session.execute(
+            select(*EXPIRING_COLUMNS)
+            .where(
+                PantryItem.user_id == user_id,
+                PantryItem.expiry_date.is_not(None),
+                PantryItem.expiry_date <= expiry_horizon()
+            )
+            .order_by(PantryItem.expiry_date, PantryItem.id)
+        )
+        items = [_as_item(row) for row in result.all()]
+        expiring_items_index.set(user_id, items)
+    return items
+
+
+def expiring_names(items: List[Dict[str, Any]]) -> List[str]:
+    """Names to prioritize in prompts; already expired items are left out"""
+    today = datetime.utcnow().date()
+    return [item["ingredient_name"] for item in items if item["expiry_date"].date() >= today]
+
+
+async def sweep_expiring_items(batch_size: Optional[int] = None) -> int:
+    """Rebuild the whole index in keyset batches over (expiry_date, id); returns the item count"""
+    batch_size = batch_size or settings.PANTRY_EXPIRY_SWEEP_BATCH_SIZE
+    now = datetime.utcnow()
+    horizon = expiry_horizon(now)
+    by_user: Dict[int, List[Dict[str, Any]]] = {}
+    last = None
+    total = 0
+
+    expiring_items_index.begin_sweep()
+    try:
+        while True:
+            query = select(*EXPIRING_COLUMNS).where(
+                PantryItem.expiry_date.is_not(None),
+                PantryItem.expiry_date <= horizon
+            )
+            if last is not None:
+                query = query.where(or_(
+                    PantryItem.expiry_date > last.expiry_date,
+                    and_(PantryItem.expiry_date == last.expiry_date, PantryItem.id > last.id)
+                ))
+            query = query.order_by(PantryItem.expiry_date, PantryItem.id).limit(batch_size)
+
+            # A short session per batch, so the sweep never pins a pooled connection
+            async with async_session_factory() as session:
+                rows = (await session.execute(query)).all()
+
+            for row in rows:
+                by_user.setdefault(row.user_id, []).append(_as_item(row))
+            total += len(rows)
+            if len(rows) < batch_size:
+                break
+            last = rows[-1]
+    except BaseException:
+        expiring_items_index.abort_sweep()
+        raise
+
+    expiring_items_index.finish_sweep(by_user, now)
+    return total
+
+
+class ExpirySweeper:
+    """Background task that periodically rebuilds expiring_items_index"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                count = await sweep_expiring_items()
+                print(f"expiry sweep: {count} items expiring within {settings.PANTRY_EXPIRY_WINDOW_DAYS} days")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"expiry sweep failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+expiry_sweeper = ExpirySweeper(settings.PANTRY_EXPIRY_SWEEP_INTERVAL_SECONDS)
@@ -1,35 +1,59 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import List
 
 from db.main import get_session
+from db.query_budget import query_budget
+from responses import model_response
 from auth.service import get_current_user
 from db.models import User
 from pantry.schemas import (
     PantryItemCreate, 
     PantryItemResponse, 
     PantryBulkUpdate,
-    
+    PantrySyncResponse,
+    ExpiringPantryItem
 )
 from pantry.service import (
     get_pantry_items, 
     add_pantry_item, 
     bulk_update_pantry,
+    sync_pantry,
     delete_pantry_item,
     bulk_add_pantry_items
 )
+from pantry.expiry import get_expiring_items
 
 router = APIRouter()
 
 @router.get("/items", response_model=List[PantryItemResponse])
+@query_budget(2)
 async def get_user_pantry_items(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     items = await get_pantry_items(session, current_user.id)
-    return items
+    return model_response(List[PantryItemResponse], items)
+
+@router.get("/items/expiring", response_model=List[ExpiringPantryItem])
+async def get_user_expiring_items(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    items = await get_expiring_items(session, current_user.id)
+    today = datetime.utcnow().date()
+    return [
+        {
+            **item,
+            "days_left": (item["expiry_date"].date() - today).days,
+            "expired": item["expiry_date"].date() < today
+        }
+        for item in items
+    ]
 
 @router.post("/items", response_model=PantryItemResponse)
+@query_budget(3)
 async def add_new_pantry_item(
     item_data: PantryItemCreate,
     current_user: User = Depends(get_current_user),
@@ -45,7 +69,16 @@ async def bulk_update_pantry_items(
     session: AsyncSession = Depends(get_session)
 ):
     items = await bulk_update_pantry(session, current_user.id, update_data.items)
-    return items
+    return model_response(List[PantryItemResponse], items)
+
+@router.put("/items/sync", response_model=PantrySyncResponse)
+async def sync_pantry_items(
+    sync_data: PantryBulkUpdate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    result = await sync_pantry(session, current_user.id, sync_data.items)
+    return model_response(PantrySyncResponse, result)
 
 @router.delete("/items/{item_id}")
 async def delete_pantry_item_by_id(
@@ -66,4 +99,4 @@ async def bulk_add_pantry_items_route(
     session: AsyncSession = Depends(get_session)
 ):
     items = await bulk_add_pantry_items(session, current_user.id, add_data.items)
-    return items
\ No newline at end of file
+    return model_response(List[PantryItemResponse], items)
\ No newline at end of file
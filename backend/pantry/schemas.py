@@ -21,4 +21,20 @@ class PantryItemResponse(PantryItemBase):
         from_attributes = True
 
 class PantryBulkUpdate(BaseModel):
-    items: List[PantryItemCreate]
\ No newline at end of file
+    items: List[PantryItemCreate]
+
+class ExpiringPantryItem(BaseModel):
+    id: int
+    ingredient_name: str
+    quantity: Optional[str] = None
+    unit: Optional[str] = None
+    expiry_date: datetime
+    days_left: int
+    expired: bool
+
+class PantrySyncResponse(BaseModel):
+    items: List[PantryItemResponse]
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
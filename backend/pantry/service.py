@@ -1,9 +1,14 @@
+from collections import defaultdict
 from sqlmodel import select
+from sqlalchemy import delete, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from db.models import PantryItem
 from pantry.schemas import PantryItemCreate
+from dashboard.service import bump_user_stats
+from ingredients.normalizer import canonicalize
+from pantry.expiry import expiring_items_index
 
 async def get_pantry_items(
     session: AsyncSession, 
@@ -37,8 +42,9 @@ async def add_pantry_item(
     )
     
     session.add(item)
+    await bump_user_stats(session, user_id, pantry_items_count=1)
     await session.commit()
-    await session.refresh(item)
+    expiring_items_index.invalidate(user_id)
     return item
 
 async def bulk_update_pantry(
@@ -47,35 +53,77 @@ async def bulk_update_pantry(
     items: List[PantryItemCreate]
 ) -> List[PantryItem]:
     
-    # Clear existing items
-    result = await session.execute(select(PantryItem).where(PantryItem.user_id == user_id))
-    existing_items = result.scalars().all()
-    
-    for item in existing_items:
-        await session.delete(item)
-    
-    # Add new items
-    new_items = []
-    for item_data in items:
-        # Convert item_data to dictionary
-        item_dict = item_data.dict()
-        
-        # Fix the timezone issue for expiry_date
-        expiry_date = item_dict.get("expiry_date")
-        if expiry_date and expiry_date.tzinfo is not None:
-            item_dict["expiry_date"] = expiry_date.replace(tzinfo=None)
-        
-        item = PantryItem(user_id=user_id, **item_dict)
-        session.add(item)
-        new_items.append(item)
+    # Replace the whole pantry: one DELETE, one multi-row INSERT ... RETURNING
+    result = await session.execute(delete(PantryItem).where(PantryItem.user_id == user_id))
+    new_items = await _insert_pantry_items(session, user_id, items)
     
+    await bump_user_stats(session, user_id, pantry_items_count=len(new_items) - result.rowcount)
     await session.commit()
-    
-    # Refresh all new items
-    for item in new_items:
-        await session.refresh(item)
-    
+    expiring_items_index.invalidate(user_id)
     return new_items
+
+async def sync_pantry(
+    session: AsyncSession,
+    user_id: int,
+    items: List[PantryItemCreate]
+) -> Dict[str, Any]:
+    """Make the stored pantry match the client's full list, touching only rows that changed.
+
+    Items are matched on their canonical ingredient name ("Tomatoes" updates an
+    existing "tomato"); matched rows keep their id and created_at. The diff is
+    applied as one DELETE, one UPDATE by primary key and one INSERT ... RETURNING,
+    all in a single transaction. "items" holds a PantryItem per requested item, in order.
+    """
+    result = await session.execute(
+        select(PantryItem.__table__)
+        .where(PantryItem.user_id == user_id)
+        .order_by(PantryItem.id)
+    )
+    existing_by_name: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in result.mappings().all():
+        existing_by_name[canonicalize(row["ingredient_name"])].append(dict(row))
+    
+    synced: List[Optional[PantryItem]] = [None] * len(items)
+    updates, to_insert, insert_positions = [], [], []
+    unchanged = 0
+    for position, item_data in enumerate(items):
+        values = _item_values(item_data)
+        matches = existing_by_name.get(canonicalize(values["ingredient_name"]))
+        if not matches:
+            to_insert.append(item_data)
+            insert_positions.append(position)
+            continue
+        
+        current = matches.pop(0)
+        if any(current[field] != value for field, value in values.items()):
+            # Same keys for every row, so the UPDATE goes out as a single executemany
+            updates.append({"id": current["id"], **values})
+            current.update(values)
+        else:
+            unchanged += 1
+        # Detached PantryItem like the inserted rows, not the raw row mapping
+        synced[position] = PantryItem(**current)
+    
+    stale_ids = [row["id"] for rows in existing_by_name.values() for row in rows]
+    if stale_ids:
+        await session.execute(delete(PantryItem).where(PantryItem.id.in_(stale_ids)))
+    if updates:
+        await session.execute(update(PantryItem), updates)
+    inserted = await _insert_pantry_items(session, user_id, to_insert)
+    for position, item in zip(insert_positions, inserted):
+        synced[position] = item
+    
+    await bump_user_stats(session, user_id, pantry_items_count=len(inserted) - len(stale_ids))
+    await session.commit()
+    expiring_items_index.invalidate(user_id)
+    return {
+        "items": synced,
+        "inserted": len(inserted),
+        "updated": len(updates),
+        "deleted": len(stale_ids),
+        "unchanged": unchanged
+    }
+
 async def delete_pantry_item(
     session: AsyncSession,
     item_id: int,
@@ -94,7 +142,9 @@ async def delete_pantry_item(
         return False
     
     await session.delete(item)
+    await bump_user_stats(session, user_id, pantry_items_count=-1)
     await session.commit()
+    expiring_items_index.invalidate(user_id)
     return True
 async def bulk_add_pantry_items(
     session: AsyncSession,
@@ -102,23 +152,38 @@ async def bulk_add_pantry_items(
     items: List[PantryItemCreate]
 ) -> List[PantryItem]:
     
-    new_items = []
-    
-    for item_data in items:
-        item_dict = item_data.dict()
-        
-        # Fix timezone-aware datetime
-        expiry_date = item_dict.get("expiry_date")
-        if expiry_date and expiry_date.tzinfo is not None:
-            item_dict["expiry_date"] = expiry_date.replace(tzinfo=None)
-        
-        item = PantryItem(user_id=user_id, **item_dict)
-        session.add(item)
-        new_items.append(item)
+    new_items = await _insert_pantry_items(session, user_id, items)
     
+    await bump_user_stats(session, user_id, pantry_items_count=len(new_items))
     await session.commit()
+    expiring_items_index.invalidate(user_id)
+    return new_items
+
+def _item_values(item_data: PantryItemCreate) -> Dict[str, Any]:
+    item_dict = item_data.dict()
     
-    for item in new_items:
-        await session.refresh(item)
-    
-    return new_items
\ No newline at end of file
+    # Fix timezone-aware datetime
+    expiry_date = item_dict.get("expiry_date")
+    if expiry_date and expiry_date.tzinfo is not None:
+        item_dict["expiry_date"] = expiry_date.replace(tzinfo=None)
+    return item_dict
+
+async def _insert_pantry_items(
+    session: AsyncSession,
+    user_id: int,
+    items: List[PantryItemCreate]
+) -> List[PantryItem]:
+    """Multi-row INSERT ... RETURNING; rows come back complete, so no per-item refresh"""
+    if not items:
+        return []
+    # SQLAlchemy can't batch an ordered RETURNING on SQLite and would fall back to one
+    # INSERT per row; SQLite assigns rowids in VALUES order, so sorting on id is enough there
+    ordered = session.get_bind().dialect.name != "sqlite"
+    result = await session.scalars(
+        insert(PantryItem).returning(PantryItem, sort_by_parameter_order=ordered),
+        [{"user_id": user_id, **_item_values(item_data)} for item_data in items],
+        # Keep None values in the statement so rows with different empty fields stay in one batch
+        execution_options={"render_nulls": True}
+    )
+    new_items = result.all()
+    return new_items if ordered else sorted(new_items, key=lambda item: item.id)
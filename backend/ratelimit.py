@@ -0,0 +1,134 @@
+"""Per-user token-bucket rate limits for the LLM-backed routes.
+
+Every (user, scope) pair has a bucket holding up to `burst` requests that
+refills at RATE_LIMITS[scope] per minute. A request finding its bucket empty
+gets a 429 with Retry-After set to when it would next be allowed. Besides its
+endpoint's scope, a request is also charged to the user's "user" bucket, once
+per LLM generation it stands for (a week's meal plan counts seven times).
+
+Routes opt in with a dependency, or call enforce_rate_limit() once they know
+how many generations the request stands for. Either also makes the request's
+LLM calls queue as this user's in the fair scheduler (llm/scheduler.py):
+
+    @router.post("/generate", dependencies=[Depends(RateLimit("recipe"))])
+
+Buckets live in this process: with several workers, each enforces the limits
+on its own share of the traffic.
+"""
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import Depends, HTTPException, status
+
+from auth.service import get_current_user
+from config import settings
+from db.models import User
+from llm.scheduler import schedule_as
+from metrics import Counter
+
+USER_SCOPE = "user"
+
+rate_limited = Counter("rate_limited_total", "Requests refused by a rate limit, by scope", ("scope",))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, per_minute: float, burst: int, now: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (0 if they are now)"""
+        self._refill(now)
+        # A request larger than the burst only needs a full bucket
+        missing = min(cost, self.capacity) - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf
+
+    def take(self, cost: float) -> None:
+        self.tokens -= min(cost, self.capacity)
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Tuple[float, int]], max_users: int):
+        self.limits = limits
+        # A bucket left alone long enough to refill completely is the same as a new one
+        refill_seconds = max((burst / per_minute * 60 for per_minute, burst in limits.values() if per_minute), default=60)
+        self._buckets = TTLCache(maxsize=max_users * max(len(limits), 1), ttl=refill_seconds)
+
+    def _bucket(self, user_id: int, scope: str, now: float) -> TokenBucket:
+        key = (user_id, scope)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            per_minute, burst = self.limits[scope]
+            bucket = TokenBucket(per_minute, burst, now)
+        # Re-set on every use, so only idle (and so already full) buckets expire
+        self._buckets[key] = bucket
+        return bucket
+
+    def hit(self, user_id: int, charges: Dict[str, float], now: Optional[float] = None) -> Tuple[float, Optional[str]]:
+        """Charge every scope its cost, or none of them.
+
+        Returns (0, None) when allowed, else the seconds to wait and the scope that refused.
+        """
+        now = time.monotonic() if now is None else now
+        buckets = [
+            (scope, self._bucket(user_id, scope, now), cost)
+            for scope, cost in charges.items() if scope in self.limits
+        ]
+        wait, refused = 0.0, None
+        for scope, bucket, cost in buckets:
+            scope_wait = bucket.wait_time(cost, now)
+            if scope_wait > wait:
+                wait, refused = scope_wait, scope
+        if refused is None:
+            for _, bucket, cost in buckets:
+                bucket.take(cost)
+        return wait, refused
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+rate_limiter = RateLimiter(settings.RATE_LIMITS, settings.RATE_LIMIT_MAX_USERS)
+
+
+def enforce_rate_limit(user_id: int, scope: str, generations: int = 1) -> None:
+    """Charge one request to scope and `generations` to the user's total, or raise 429.
+
+    LLM calls made for the rest of the request queue as this user's, rate limited or not.
+    """
+    schedule_as(user_id)
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    wait, refused = rate_limiter.hit(user_id, {scope: 1, USER_SCOPE: generations})
+    if refused is None:
+        return
+    rate_limited.inc(refused)
+    retry_after = max(1, math.ceil(wait)) if math.isfinite(wait) else None
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Rate limit exceeded for {refused}" + (f", retry in {retry_after}s" if retry_after else ""),
+        headers={"Retry-After": str(retry_after)} if retry_after else None
+    )
+
+
+class RateLimit:
+    """Route dependency charging one request to `scope` for the current user"""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+
+    async def __call__(self, current_user: User = Depends(get_current_user)) -> User:
+        enforce_rate_limit(current_user.id, self.scope)
+        return current_user
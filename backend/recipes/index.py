@@ -0,0 +1,88 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from cachetools import LRUCache
+
+from config import settings
+from ingredients.normalizer import IngredientMatcher, canonical_set, canonicalize
+from metrics import record_cache_lookup
+
+
+class RecipeMatch:
+    def __init__(self, recipe_id: int, coverage: float, used: List[str], missing: List[str]):
+        self.recipe_id = recipe_id
+        self.coverage = coverage
+        self.used = used
+        self.missing = missing
+
+
+class RecipeIngredientIndex:
+    """Inverted index from canonical ingredient name to a user's saved recipe ids.
+
+    Only ids and ingredient names are held in memory; callers load the full
+    recipe_data for the few recipes they actually return.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, List[str]]]):
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        # recipe id -> [(canonical, original)] in recipe order
+        self.ingredients: Dict[int, List[Tuple[str, str]]] = {}
+
+        for recipe_id, ingredients in rows:
+            entries = []
+            seen = set()
+            for name in ingredients or []:
+                key = canonicalize(name)
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                entries.append((key, name))
+                self.postings[key].add(recipe_id)
+            if entries:
+                self.ingredients[recipe_id] = entries
+
+    def __len__(self) -> int:
+        return len(self.ingredients)
+
+    def rank(self, pantry: Iterable[str], exclusions: Iterable[str] = ()) -> List[RecipeMatch]:
+        """Rank recipes by the fraction of their ingredients found in the pantry"""
+        pantry_keys = canonical_set(pantry)
+        excluded = IngredientMatcher(exclusions)
+
+        hits: Dict[int, int] = defaultdict(int)
+        for key in pantry_keys:
+            for recipe_id in self.postings.get(key, ()):
+                hits[recipe_id] += 1
+
+        matches = []
+        for recipe_id, count in hits.items():
+            entries = self.ingredients[recipe_id]
+            if excluded and any(excluded.matches(key) for key, _ in entries):
+                continue
+            used = [name for key, name in entries if key in pantry_keys]
+            missing = [name for key, name in entries if key not in pantry_keys]
+            matches.append(RecipeMatch(recipe_id, count / len(entries), used, missing))
+
+        matches.sort(key=lambda m: (m.coverage, len(m.used)), reverse=True)
+        return matches
+
+
+class RecipeIndexCache:
+    """Per-user index cache, invalidated whenever the user's saved recipes change"""
+
+    def __init__(self, maxsize: int):
+        self._indexes = LRUCache(maxsize=maxsize)
+
+    def get(self, user_id: int):
+        index = self._indexes.get(user_id)
+        record_cache_lookup("recipe_index", index is not None)
+        return index
+
+    def set(self, user_id: int, index: RecipeIngredientIndex) -> None:
+        self._indexes[user_id] = index
+
+    def invalidate(self, user_id: int) -> None:
+        self._indexes.pop(user_id, None)
+
+
+recipe_index_cache = RecipeIndexCache(maxsize=settings.RECIPE_INDEX_CACHE_SIZE)
@@ -1,38 +1,138 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from db.main import get_session
+from db.query_budget import query_budget
+from responses import model_response
 from auth.service import get_current_user
 from db.models import User, SavedRecipe
 from recipes.schemas import (
     RecipeGenerationRequest, 
     RecipeResponse, 
+    RecipeBatchRequest,
+    RecipeBatchResponse,
     SavedRecipeResponse,
     PantrySuggestionRequest,
-    PantryRecipeResponse
+    PantryRecipeResponse,
+    SavedRecipePage,
+    SavedRecipeSearchPage
 )
-from recipes.service import recipe_service, save_recipe, get_saved_recipes, get_saved_recipe_by_id, delete_saved_recipe
+from recipes.streaming import format_sse
+from recipes.service import recipe_service, save_recipe, get_saved_recipes, get_saved_recipe_by_id, delete_saved_recipe, get_saved_recipe_summaries, search_saved_recipes
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from jobs.routes import JOB_RESPONSES, job_accepted
+from ratelimit import RateLimit, enforce_rate_limit
 
 router = APIRouter()
 
-@router.post("/generate", response_model=RecipeResponse)
+@router.post("/generate", response_model=RecipeResponse, responses=JOB_RESPONSES)
+@query_budget(4)
 async def generate_recipe(
     request: RecipeGenerationRequest,
+    job: bool = Query(False, description="Run in the background and return 202 with a job to poll"),
+    idempotency_key: Optional[str] = Header(None, max_length=128),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
+    if job:
+        return await job_accepted(session, current_user.id, "recipe", request, idempotency_key, rate_limit_scope="recipe")
+    enforce_rate_limit(current_user.id, "recipe")
     try:
         recipe = await recipe_service.generate_recipe(request, current_user, session)
-        return recipe
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    # Serialized here rather than by FastAPI so it shows up as the serialize phase
+    return model_response(RecipeResponse, recipe)
+
+@router.post("/generate/stream", dependencies=[Depends(RateLimit("recipe"))])
+async def generate_recipe_stream(
+    request: RecipeGenerationRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    # Load the profile (and expiring items) up front so the session isn't held for the whole stream
+    taste_profile = await recipe_service.get_taste_profile(session, current_user.id)
+    expiring = await recipe_service.get_expiring_for(session, current_user.id, request.use_pantry)
+
+    async def event_stream():
+        try:
+            async for event, data in recipe_service.stream_recipe(request, taste_profile, current_user.id, expiring):
+                yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate/batch", response_model=RecipeBatchResponse)
+@query_budget(4)
+async def generate_recipe_batch(
+    request: RecipeBatchRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    try:
+        themes = recipe_service.batch_themes(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    enforce_rate_limit(current_user.id, "recipe_batch", generations=len(themes))
+    # One profile and expiring-items lookup for every recipe in the plan
+    taste_profile = await recipe_service.get_taste_profile(session, current_user.id)
+    expiring = await recipe_service.get_expiring_for(session, current_user.id, request.use_pantry)
+
+    items = [
+        item async for item in
+        recipe_service.generate_recipe_batch(request, taste_profile, current_user.id, expiring)
+    ]
+    items.sort(key=lambda item: item["index"])
+    return model_response(RecipeBatchResponse, {"items": items})
+
+@router.post("/generate/batch/stream")
+async def generate_recipe_batch_stream(
+    request: RecipeBatchRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    try:
+        themes = recipe_service.batch_themes(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    enforce_rate_limit(current_user.id, "recipe_batch", generations=len(themes))
+    taste_profile = await recipe_service.get_taste_profile(session, current_user.id)
+    expiring = await recipe_service.get_expiring_for(session, current_user.id, request.use_pantry)
 
-@router.post("/suggest-from-pantry", response_model=List[PantryRecipeResponse])
+    async def event_stream():
+        # One "recipe" event per theme as it finishes (with "error" instead of "recipe" if it failed)
+        succeeded = failed = 0
+        async for item in recipe_service.generate_recipe_batch(request, taste_profile, current_user.id, expiring):
+            if "error" in item:
+                failed += 1
+            else:
+                succeeded += 1
+            yield format_sse("recipe", item)
+        yield format_sse("done", {"succeeded": succeeded, "failed": failed})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/suggest-from-pantry", response_model=List[PantryRecipeResponse], responses=JOB_RESPONSES)
 async def suggest_from_pantry(
     request: PantrySuggestionRequest,
+    job: bool = Query(False, description="Run in the background and return 202 with a job to poll"),
+    idempotency_key: Optional[str] = Header(None, max_length=128),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
+    if job:
+        return await job_accepted(session, current_user.id, "pantry", request, idempotency_key, rate_limit_scope="pantry")
+    enforce_rate_limit(current_user.id, "pantry")
     try:
         recipes = await recipe_service.generate_pantry_suggestions(
             request,
@@ -40,16 +140,44 @@ async def suggest_from_pantry(
             session
         )
         return recipes
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/saved", response_model=List[SavedRecipeResponse])
+@query_budget(2)
 async def get_user_saved_recipes(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     recipes = await get_saved_recipes(session, current_user.id)
-    return recipes
+    return model_response(List[SavedRecipeResponse], recipes)
+
+@router.get("/saved/summary", response_model=SavedRecipePage)
+async def get_user_saved_recipe_summaries(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    try:
+        page = await get_saved_recipe_summaries(session, current_user.id, cursor, limit)
+    except ValueError as e:
+        # A malformed cursor; serialization errors below are ours, not the client's
+        raise HTTPException(status_code=400, detail=str(e))
+    return model_response(SavedRecipePage, page)
+
+@router.get("/saved/search", response_model=SavedRecipeSearchPage)
+async def search_user_saved_recipes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    page = await search_saved_recipes(session, current_user.id, q, limit, offset)
+    return model_response(SavedRecipeSearchPage, page)
 
 @router.get("/saved/{recipe_id}", response_model=SavedRecipeResponse)
 async def get_saved_recipe(
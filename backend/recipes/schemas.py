@@ -1,5 +1,5 @@
       
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -7,6 +7,15 @@ class RecipeGenerationRequest(BaseModel):
     theme: str
     language: str 
     use_pantry: bool = False
+    use_cache: bool = True
+
+class RecipeBatchRequest(BaseModel):
+    # One recipe per theme; leave empty to plan `days` varied meals
+    themes: List[str] = []
+    days: int = Field(7, ge=1, le=7)
+    language: str
+    use_pantry: bool = False
+    use_cache: bool = True
 
 class Ingredient(BaseModel):
     name: str
@@ -30,6 +39,16 @@ class RecipeResponse(BaseModel):
     tags: List[str]
     servings: Optional[int] = 4
 
+class RecipeBatchItem(BaseModel):
+    index: int
+    theme: str
+    recipe: Optional[RecipeResponse] = None
+    error: Optional[str] = None
+
+class RecipeBatchResponse(BaseModel):
+    # In request order; a failed theme has `error` instead of `recipe`
+    items: List[RecipeBatchItem]
+
 class RecipeSave(BaseModel):
     recipe_title: str
     recipe_data: Dict[str, Any]
@@ -51,6 +70,28 @@ class SavedRecipeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SavedRecipeSummary(BaseModel):
+    id: int
+    recipe_title: str
+    dietary_tags: List[str]
+    cooking_time: Optional[str]
+    difficulty_level: Optional[str]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class SavedRecipePage(BaseModel):
+    items: List[SavedRecipeSummary]
+    next_cursor: Optional[str] = None
+
+class SavedRecipeSearchResult(SavedRecipeSummary):
+    rank: float
+
+class SavedRecipeSearchPage(BaseModel):
+    items: List[SavedRecipeSearchResult]
+    next_offset: Optional[int] = None
+
 class PantrySuggestionRequest(BaseModel):
     language: str 
 
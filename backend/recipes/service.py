@@ -1,15 +1,75 @@
+import asyncio
 import json
-import google.generativeai as genai
+import time
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any,Optional
+from typing import List, Dict, Any,Optional, AsyncIterator, Tuple, Sequence
 
 from db.models import SavedRecipe, User, UserTasteProfile, PantryItem
-from recipes.schemas import RecipeGenerationRequest, PantrySuggestionRequest
+from recipes.schemas import RecipeGenerationRequest, RecipeBatchRequest, PantrySuggestionRequest, RecipeResponse, PantryRecipeResponse
+from llm.client import llm_client
+from llm.cache import ResponseCache, normalize_text, profile_fingerprint
+from llm.singleflight import generation_flights
+from llm.schemas import model_schema
+from llm.parsing import generate_items, parse_json
+from llm.prompts import compact_prompt, output_instructions
+from config import settings
+from recipes.streaming import RecipeStreamParser
+from recipes.index import RecipeIngredientIndex, RecipeMatch, recipe_index_cache
+from ingredients.normalizer import IngredientMatcher, canonical_set, dedupe
+from pantry.expiry import get_expiring_items, expiring_names
+from db.pagination import keyset_paginate, build_page
+from db.search import full_text_search, saved_recipes_search
+from dashboard.service import GenerationTally, bump_user_stats, record_generation
+from metrics import timed
+
+RECIPE_JSON_EXAMPLE = """{
+    "title": "Recipe Title",
+    "description": "Brief description explaining any substitutions made",
+    "ingredients": [{"name": "ingredient", "quantity": "amount", "unit": "unit"}],
+    "instructions": ["step 1", "step 2"],
+    "cooking_time": "appropriate time",
+    "difficulty": "Easy/Medium/Hard",
+    "servings": 4,
+    "nutrition_info": {"calories": "approx calories", "protein": "g", "carbs": "g", "fat": "g"},
+    "tags": ["tag1", "tag2"]
+}"""
+
+PANTRY_JSON_EXAMPLE = """{
+    "recipes": [{
+        "title": "Recipe Title",
+        "description": "Brief description",
+        "ingredients": [{"name": "ingredient", "quantity": "amount", "unit": "unit"}],
+        "instructions": ["step 1", "step 2"],
+        "cooking_time": "cooking time",
+        "difficulty": "Easy/Medium/Hard",
+        "servings": 4,
+        "nutrition_info": {"calories": "approx calories", "protein": "g", "carbs": "g", "fat": "g"},
+        "tags": ["tag1", "tag2"],
+        "used_pantry_ingredients": ["pantry_ing1", "pantry_ing2"],
+        "missing_ingredients": ["missing1", "missing2"]
+    }]
+}"""
+
+# "Plan my week": one varied theme per day, so the days don't come back as the same dish
+MEAL_PLAN_THEMES = [
+    "quick weeknight dinner",
+    "vegetable-forward main",
+    "one-pot meal",
+    "light and fresh",
+    "comfort food",
+    "dish from a different cuisine",
+    "slow-cooked weekend meal",
+]
 
 class RecipeService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.llm = llm_client
+        self.cache = ResponseCache(
+            maxsize=settings.RECIPE_CACHE_MAX_SIZE,
+            ttl=settings.RECIPE_CACHE_TTL_SECONDS,
+            name="recipe"
+        )
     
     async def generate_recipe(
         self, 
@@ -19,34 +79,293 @@ class RecipeService:
     ) -> Dict[str, Any]:
         
         # Get user taste profile
-        result = await session.execute(
-            select(UserTasteProfile).where(UserTasteProfile.user_id == user.id)
-        )
-        taste_profile = result.scalar_one_or_none()
+        taste_profile = await self.get_taste_profile(session, user.id)
+        expiring = await self.get_expiring_for(session, user.id, request.use_pantry)
+        return await self.generate_with_profile(request, taste_profile, user.id, expiring)
+
+    async def get_expiring_for(self, session: AsyncSession, user_id: int, use_pantry: bool) -> List[str]:
+        """Expiring pantry items to work into the recipe, only if the request asked to use the pantry"""
+        if not use_pantry:
+            return []
+        return expiring_names(await get_expiring_items(session, user_id))
+
+    async def generate_with_profile(
+        self,
+        request: RecipeGenerationRequest,
+        taste_profile: Optional[UserTasteProfile],
+        user_id: int,
+        expiring: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        if not request.use_pantry:
+            expiring = ()
+        cache_key = self._recipe_cache_key(request, taste_profile, expiring)
+        if request.use_cache and cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                await record_generation(user_id, "recipe", cache_hit=True)
+                return cached
         
+        # Duplicate in-flight requests (double clicks, client retries) share one LLM call
+        return await generation_flights.do(
+            (user_id, tuple(sorted(canonical_set(expiring)))) + self._recipe_cache_key(request, taste_profile),
+            lambda: self._generate_and_cache(request, taste_profile, cache_key, user_id, expiring)
+        )
+
+    async def generate_recipe_batch(
+        self,
+        request: RecipeBatchRequest,
+        taste_profile: Optional[UserTasteProfile],
+        user_id: int,
+        expiring: Sequence[str] = ()
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield {"index", "theme", "recipe" or "error"} for each theme as soon as it finishes.
+
+        The themes share one taste profile and expiring-items lookup and are
+        generated concurrently, bounded by the LLM client's concurrency limit,
+        so a whole plan takes about as long as its slowest recipe. Each theme
+        is cached and deduplicated like a single /recipes/generate call.
+        """
+        themes = self.batch_themes(request)
+        tally = GenerationTally(user_id)
+
+        async def generate(index: int, theme: str) -> Dict[str, Any]:
+            tally.collect()
+            single = RecipeGenerationRequest(
+                theme=theme,
+                language=request.language,
+                use_pantry=request.use_pantry,
+                use_cache=request.use_cache
+            )
+            try:
+                recipe = await self.generate_with_profile(single, taste_profile, user_id, expiring)
+                return {"index": index, "theme": theme, "recipe": recipe}
+            except Exception as e:
+                return {"index": index, "theme": theme, "error": str(e)}
+
+        tasks = [asyncio.create_task(generate(index, theme)) for index, theme in enumerate(themes)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # The client may have gone away mid-plan: cancelling a theme cancels its
+            # LLM call too, unless another request is waiting on the same call
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # One stats write for the whole batch
+            await tally.flush()
+
+    def batch_themes(self, request: RecipeBatchRequest) -> List[str]:
+        # Kept as given, so indexes match the request; repeated themes share one LLM call
+        themes = [theme.strip() for theme in request.themes] or MEAL_PLAN_THEMES[:request.days]
+        if not all(themes):
+            raise ValueError("Themes must not be empty")
+        if len(themes) > settings.RECIPE_BATCH_MAX_SIZE:
+            raise ValueError(f"At most {settings.RECIPE_BATCH_MAX_SIZE} themes per batch")
+        return themes
+
+    async def _generate_and_cache(
+        self,
+        request: RecipeGenerationRequest,
+        taste_profile: Optional[UserTasteProfile],
+        cache_key: Optional[tuple],
+        user_id: Optional[int] = None,
+        expiring: Sequence[str] = ()
+    ) -> Dict[str, Any]:
         # Build prompt
-        prompt = self._build_recipe_prompt(request, taste_profile, request.language)
+        prompt = self._build_recipe_prompt(request, taste_profile, request.language, expiring)
+        
+        llm_started = time.perf_counter()
+        try:
+            response_text = await self.llm.generate(prompt, response_schema=model_schema(RecipeResponse))
+            recipe_data = self._parse_recipe_response(response_text)
+        except Exception as e:
+            raise Exception(f"Error generating recipe: {str(e)}")
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, recipe_data)
+        await record_generation(user_id, "recipe", llm_started=llm_started)
+        return recipe_data
+
+    async def stream_recipe(
+        self,
+        request: RecipeGenerationRequest,
+        taste_profile: Optional[UserTasteProfile],
+        user_id: Optional[int] = None,
+        expiring: Sequence[str] = ()
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (event, data) pairs as recipe fields complete, ending with ("done", recipe)"""
+        parser = RecipeStreamParser()
+        
+        if not request.use_pantry:
+            expiring = ()
+        cache_key = self._recipe_cache_key(request, taste_profile, expiring)
+        if request.use_cache and cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                for event in parser.feed(json.dumps(cached)):
+                    yield event
+                await record_generation(user_id, "recipe", cache_hit=True)
+                yield "done", cached
+                return
+        
+        prompt = self._build_recipe_prompt(request, taste_profile, request.language, expiring)
         
+        llm_started = time.perf_counter()
         try:
-            response = self.model.generate_content(prompt)
-            recipe_data = self._parse_recipe_response(response.text)
-            return recipe_data
+            async for chunk in self.llm.stream(prompt, response_schema=model_schema(RecipeResponse)):
+                for event in parser.feed(chunk):
+                    yield event
+            recipe_data = self._parse_recipe_response(parser.buffer)
         except Exception as e:
             raise Exception(f"Error generating recipe: {str(e)}")
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, recipe_data)
+        await record_generation(user_id, "recipe", llm_started=llm_started)
+        yield "done", recipe_data
+
+    @timed("taste_profile")
+    async def get_taste_profile(
+        self,
+        session: AsyncSession,
+        user_id: int
+    ) -> Optional[UserTasteProfile]:
+        result = await session.execute(
+            select(UserTasteProfile).where(UserTasteProfile.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+
+    def _recipe_cache_key(
+        self,
+        request: RecipeGenerationRequest,
+        taste_profile: Optional[UserTasteProfile],
+        expiring: Sequence[str] = ()
+    ) -> Optional[tuple]:
+        """Key in the cache shared by every user with the same profile, or None to bypass it.
+
+        A use_pantry prompt asking to use up someone's expiring items is personal:
+        putting those items in the key would only split the cache per user.
+        """
+        if expiring:
+            return None
+        return (
+            "recipe",
+            normalize_text(request.theme),
+            normalize_text(request.language),
+            profile_fingerprint(taste_profile)
+        )
     
 
+    async def generate_pantry_suggestions(
+        self,
+        request: PantrySuggestionRequest,
+        user: User,
+        session: AsyncSession
+    ) -> List[Dict[str, Any]]:
+        """Suggest recipes for the user's pantry.
+
+        Saved recipes that the pantry already (mostly) covers are returned
+        straight from the local ingredient index; Gemini is only asked to fill
+        the remaining slots when there aren't enough strong local matches.
+        """
+        pantry_items = await self.get_pantry_items(session, user.id)
+        ingredient_names = [item.ingredient_name for item in pantry_items]
+        
+        if not ingredient_names:
+            raise ValueError("No pantry items found")
+        
+        taste_profile = await self.get_taste_profile(session, user.id)
+        exclusions = []
+        if taste_profile:
+            exclusions = (taste_profile.allergies or []) + (taste_profile.dislikes or [])
+        
+        count = settings.PANTRY_SUGGESTION_COUNT
+        index = await self.get_recipe_index(session, user.id)
+        strong_matches = [
+            match for match in index.rank(ingredient_names, exclusions)
+            if match.coverage >= settings.PANTRY_MATCH_MIN_COVERAGE
+        ][:count]
+        suggestions = await self._load_local_suggestions(session, user.id, strong_matches)
+        
+        if len(suggestions) >= count:
+            await record_generation(user.id, "pantry")
+            return suggestions
+        
+        expiring = expiring_names(await get_expiring_items(session, user.id))
+        needed = count - len(suggestions)
+        prompt = self._build_pantry_prompt(ingredient_names, taste_profile, request.language, expiring, needed)
+        
+        llm_started = time.perf_counter()
+        try:
+            # A truncated reply keeps its complete recipes; only the missing ones are asked for again
+            generated = await generate_items(self.llm.generate, prompt, "recipes", PantryRecipeResponse, needed, "pantry")
+        except Exception as e:
+            raise Exception(f"Error generating pantry suggestions: {str(e)}")
+        
+        await record_generation(user.id, "pantry", llm_started=llm_started)
+        return suggestions + generated
+
+    async def get_recipe_index(
+        self,
+        session: AsyncSession,
+        user_id: int
+    ) -> RecipeIngredientIndex:
+        index = recipe_index_cache.get(user_id)
+        if index is None:
+            result = await session.execute(
+                select(SavedRecipe.id, SavedRecipe.ingredients)
+                .where(SavedRecipe.user_id == user_id)
+            )
+            index = RecipeIngredientIndex(result.all())
+            recipe_index_cache.set(user_id, index)
+        return index
+
+    async def _load_local_suggestions(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        matches: List[RecipeMatch]
+    ) -> List[Dict[str, Any]]:
+        if not matches:
+            return []
+        
+        result = await session.execute(
+            select(SavedRecipe.id, SavedRecipe.recipe_data).where(
+                SavedRecipe.id.in_([match.recipe_id for match in matches]),
+                SavedRecipe.user_id == user_id
+            )
+        )
+        recipe_data_by_id = {row.id: row.recipe_data for row in result.all()}
+        
+        suggestions = []
+        for match in matches:
+            recipe_data = recipe_data_by_id.get(match.recipe_id)
+            if not recipe_data:
+                continue
+            suggestions.append({
+                **recipe_data,
+                "cooking_time": recipe_data.get("cooking_time") or "",
+                "used_pantry_ingredients": match.used,
+                "missing_ingredients": match.missing
+            })
+        return suggestions
+
+    @timed("prompt")
     def _build_recipe_prompt(
         self, 
         request: RecipeGenerationRequest, 
         taste_profile: UserTasteProfile,
-        language: str
+        language: str,
+        expiring: Sequence[str] = ()
     ) -> str:
         
         # Build exclusion lists
         allergies = taste_profile.allergies if taste_profile and taste_profile.allergies else []
         dislikes = taste_profile.dislikes if taste_profile and taste_profile.dislikes else []
-        absolute_exclusions = list(set(allergies + dislikes))
+        absolute_exclusions = dedupe(allergies + dislikes)
         exclusions_text = ", ".join(absolute_exclusions) if absolute_exclusions else "None"
+        use_soon = dedupe(IngredientMatcher(absolute_exclusions).filter(expiring))
         
         prompt = f"""
         Generate a detailed recipe in {language} based on the user's request.
@@ -61,6 +380,7 @@ class RecipeService:
         - Spice: {taste_profile.spice_level if taste_profile else 2}/5
         - Oil: {taste_profile.oil_preference if taste_profile else 'moderate'}
         - Cooking time: {taste_profile.cooking_time_preference if taste_profile else 30} min preferred
+        - Pantry items expiring soon (use them if they fit the request): {', '.join(use_soon) if use_soon else 'None'}
         
         DECISION RULES:
         1. If the requested theme DOES NOT contain any disliked/allergic ingredients:
@@ -74,48 +394,33 @@ class RecipeService:
         
         3. NEVER include ingredients from the dislikes/allergies list
         
-        Please provide the recipe in this exact JSON format:
-        {{
-            "title": "Recipe Title",
-            "description": "Brief description explaining any substitutions made",
-            "ingredients": [
-                {{"name": "ingredient", "quantity": "amount", "unit": "unit"}}
-            ],
-            "instructions": ["step 1", "step 2", ...],
-            "cooking_time": "appropriate time",
-            "difficulty": "Easy/Medium/Hard",
-            "servings": 4,
-            "nutrition_info": {{
-                "calories": "approx calories",
-                "protein": "g",
-                "carbs": "g",
-                "fat": "g"
-            }},
-            "tags": ["tag1", "tag2", ...]
-        }}
+        Use "Easy", "Medium" or "Hard" for difficulty.
+        {output_instructions(RECIPE_JSON_EXAMPLE)}
         """
-        return prompt
+        return compact_prompt(prompt)
+    @timed("prompt")
     def _build_pantry_prompt(
     self, 
     ingredients: List[str], 
     taste_profile: UserTasteProfile,
-    language: str
+    language: str,
+    expiring: Sequence[str] = (),
+    count: int = 3
 ) -> str:
     
     # Filter out excluded ingredients
         allergies = taste_profile.allergies if taste_profile and taste_profile.allergies else []
         dislikes = taste_profile.dislikes if taste_profile and taste_profile.dislikes else []
-        absolute_exclusions = list(set(allergies + dislikes))
+        exclusions = IngredientMatcher(allergies + dislikes)
         
-        safe_ingredients = [
-            ing for ing in ingredients 
-            if ing.lower() not in [excl.lower() for excl in absolute_exclusions]
-        ]
+        safe_ingredients = dedupe(exclusions.filter(ingredients))
+        use_first = dedupe(exclusions.filter(expiring))
         
         prompt = f"""
-        Generate 3 complete recipes in {language} using available ingredients while respecting user restrictions.
+        Generate {count} complete {'recipe' if count == 1 else 'recipes'} in {language} using available ingredients while respecting user restrictions.
         
         AVAILABLE INGREDIENTS: {', '.join(safe_ingredients)}
+        EXPIRING SOON (use these first): {', '.join(use_first) if use_first else 'None'}
         
         USER RESTRICTIONS:
         - Allergies: {', '.join(taste_profile.allergies) if taste_profile and taste_profile.allergies else 'None'}
@@ -125,57 +430,26 @@ class RecipeService:
         
         RULES:
         - Only use ingredients from the available list
+        - Prefer recipes that use up the expiring ingredients
         - Never include allergic or disliked ingredients
         - Prioritize recipes that incorporate user's liked ingredients
         - Adapt recipes to match dietary preferences
         
-        Return in this exact JSON format:
-        {{
-            "recipes": [
-                {{
-                    "title": "Recipe Title",
-                    "description": "Brief description",
-                    "ingredients": [
-                        {{"name": "ingredient", "quantity": "amount", "unit": "unit"}}
-                    ],
-                    "instructions": ["step 1", "step 2", ...],
-                    "cooking_time": "cooking time",
-                    "difficulty": "Easy/Medium/Hard",
-                    "servings": 4,
-                    "nutrition_info": {{
-                        "calories": "approx calories",
-                        "protein": "g",
-                        "carbs": "g",
-                        "fat": "g"
-                    }},
-                    "tags": ["tag1", "tag2", ...],
-                    "used_pantry_ingredients": ["pantry_ing1", "pantry_ing2"],
-                    "missing_ingredients": ["missing1", "missing2"]
-                }}
-            ]
-        }}
+        - Use "Easy", "Medium" or "Hard" for difficulty
+        {output_instructions(PANTRY_JSON_EXAMPLE)}
         """
-        return prompt
+        return compact_prompt(prompt)
 
     def _parse_recipe_response(self, response_text: str) -> Dict[str, Any]:
         try:
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            json_str = response_text[start:end]
-            return json.loads(json_str)
+            result = parse_json(response_text, "recipe")
+            if result.truncated:
+                # Cutting back to the last complete field must still leave a whole recipe
+                RecipeResponse.model_validate(result.data)
+            return result.data
         except Exception as e:
             raise Exception(f"Failed to parse recipe response: {str(e)}")
 
-    def _parse_pantry_recipes_response(self, response_text: str) -> List[Dict[str, Any]]:
-        try:
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            json_str = response_text[start:end]
-            data = json.loads(json_str)
-            return data.get("recipes", [])
-        except Exception as e:
-            raise Exception(f"Failed to parse pantry recipes response: {str(e)}")
-
     async def get_pantry_items(
         self,
         session: AsyncSession, 
@@ -207,8 +481,9 @@ async def save_recipe(
     )
     
     session.add(recipe)
+    await bump_user_stats(session, user_id, saved_recipes_count=1)
     await session.commit()
-    await session.refresh(recipe)
+    recipe_index_cache.invalidate(user_id)
     return recipe
 
 async def get_saved_recipes(
@@ -223,6 +498,50 @@ async def get_saved_recipes(
     )
     return result.scalars().all()
 
+async def get_saved_recipe_summaries(
+    session: AsyncSession,
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """One page of saved recipes, newest first, without the recipe_data blob"""
+    query = select(
+        SavedRecipe.id,
+        SavedRecipe.recipe_title,
+        SavedRecipe.dietary_tags,
+        SavedRecipe.cooking_time,
+        SavedRecipe.difficulty_level,
+        SavedRecipe.created_at
+    ).where(SavedRecipe.user_id == user_id)
+    
+    result = await session.execute(
+        keyset_paginate(query, SavedRecipe.created_at, SavedRecipe.id, cursor, limit)
+    )
+    items, next_cursor = build_page(result.all(), limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+async def search_saved_recipes(
+    session: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """Saved recipes matching query in title, ingredients, tags or instructions, best match first"""
+    table = SavedRecipe.__table__
+    rows = await full_text_search(
+        session,
+        saved_recipes_search,
+        [table.c.id, table.c.recipe_title, table.c.dietary_tags, table.c.cooking_time,
+         table.c.difficulty_level, table.c.created_at],
+        user_id,
+        query,
+        limit + 1,
+        offset
+    )
+    next_offset = offset + limit if len(rows) > limit else None
+    return {"items": rows[:limit], "next_offset": next_offset}
+
 # Add these functions to your existing recipes/service.py
 
 async def get_saved_recipe_by_id(session: AsyncSession, recipe_id: int, user_id: int) -> Optional[SavedRecipe]:
@@ -255,7 +574,9 @@ async def delete_saved_recipe(session: AsyncSession, recipe_id: int, user_id: in
             return False
             
         await session.delete(recipe)
+        await bump_user_stats(session, user_id, saved_recipes_count=-1)
         await session.commit()
+        recipe_index_cache.invalidate(user_id)
         return True
     except Exception as e:
         await session.rollback()
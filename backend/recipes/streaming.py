@@ -0,0 +1,124 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+# Top-level array fields are streamed one element at a time under a singular event name
+ARRAY_ITEM_EVENTS = {
+    "ingredients": "ingredient",
+    "instructions": "instruction",
+    "tags": "tag",
+}
+
+
+class RecipeStreamParser:
+    """Incrementally scan a streamed recipe JSON object.
+
+    feed() accepts raw model output in arbitrary chunks and returns the
+    fields that became complete, as (event, value) pairs:
+    - top-level scalars and objects ("title", "nutrition_info", ...) once their value closes
+    - each element of a top-level array ("ingredient", "instruction", "tag")
+    Anything before the first "{" (markdown fences, chatter) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._expect_key = False
+        self._value_start: Optional[int] = None
+        self._array_index = 0
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self.buffer += text
+        events: List[Tuple[str, Any]] = []
+        buf = self.buffer
+
+        while self._pos < len(buf) and not self.done:
+            i = self._pos
+            c = buf[i]
+            self._pos += 1
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                    elif self._value_start is not None and self._is_value_level(depth):
+                        self._emit(events, buf[self._value_start:i + 1])
+                continue
+
+            if depth == 0:
+                if c == "{":
+                    self._stack.append(c)
+                    self._expect_key = True
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if depth == 1 and self._expect_key:
+                    self._key_start = i
+                    self._expect_key = False
+                elif self._value_start is None and self._is_value_level(depth):
+                    self._value_start = i
+            elif c in "{[":
+                if depth == 1 and c == "[" and self._key in ARRAY_ITEM_EVENTS:
+                    self._array_index = 0
+                elif self._value_start is None and self._is_value_level(depth):
+                    self._value_start = i
+                self._stack.append(c)
+            elif c in "}]":
+                self._finish_scalar(events, buf, i, depth)
+                self._stack.pop()
+                depth -= 1
+                if depth == 0:
+                    self.done = True
+                elif self._value_start is not None and self._is_value_level(depth):
+                    self._emit(events, buf[self._value_start:i + 1])
+            elif c == ",":
+                self._finish_scalar(events, buf, i, depth)
+                if depth == 1:
+                    self._expect_key = True
+            elif c == ":":
+                continue
+            elif not c.isspace() and self._value_start is None and self._is_value_level(depth):
+                # Start of a number / true / false / null
+                self._value_start = i
+
+        return events
+
+    def _is_value_level(self, depth: int) -> bool:
+        """True when the scanner sits where a streamable value begins or ends"""
+        if depth == 1:
+            return not self._expect_key and self._key is not None
+        return depth == 2 and self._stack[1] == "[" and self._key in ARRAY_ITEM_EVENTS
+
+    def _finish_scalar(self, events, buf: str, end: int, depth: int) -> None:
+        # Numbers and literals have no closing delimiter; they end at "," or a closing bracket
+        if self._value_start is not None and self._is_value_level(depth):
+            self._emit(events, buf[self._value_start:end].strip())
+
+    def _emit(self, events, raw: str) -> None:
+        self._value_start = None
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        if len(self._stack) == 2 and self._key in ARRAY_ITEM_EVENTS:
+            events.append((ARRAY_ITEM_EVENTS[self._key], {"index": self._array_index, "value": value}))
+            self._array_index += 1
+        else:
+            events.append((self._key, value))
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
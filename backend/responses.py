@@ -0,0 +1,56 @@
+"""Fast JSON responses.
+
+The app's default response class is ORJSONResponse. Hot endpoints go further and
+return `model_response(...)`: FastAPI passes a returned Response through untouched,
+so the usual validate -> python dict -> json.dumps path is replaced by a single
+pydantic-core dump straight to bytes. Keep `response_model=` on those routes so
+the OpenAPI schema stays the same.
+"""
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+from metrics import timed
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def _is_validated(content: Any, response_type: Any) -> bool:
+    if isinstance(response_type, type) and issubclass(response_type, BaseModel):
+        return type(content) is response_type
+    return False
+
+
+@timed("serialize")
+def dump_json(response_type: Any, content: Any) -> bytes:
+    """JSON bytes for content as response_type.
+
+    An instance of the response model itself is dumped as-is; anything else
+    (ORM rows, dicts, lists of either) is validated once from attributes first.
+    """
+    adapter = _adapter(response_type)
+    if not _is_validated(content, response_type):
+        content = adapter.validate_python(content, from_attributes=True)
+    return adapter.dump_json(content)
+
+
+def model_response(response_type: Any, content: Any, status_code: int = 200) -> Response:
+    return Response(
+        content=dump_json(response_type, content),
+        status_code=status_code,
+        media_type="application/json"
+    )
+
+
+
+def dump_jsonable(response_type: Any, content: Any) -> Any:
+    """content as JSON-compatible python objects, shaped exactly like the response_type body"""
+    adapter = _adapter(response_type)
+    if not _is_validated(content, response_type):
+        content = adapter.validate_python(content, from_attributes=True)
+    return adapter.dump_python(content, mode="json")
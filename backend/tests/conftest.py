@@ -0,0 +1,60 @@
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import time, so the environment has to be in place before any app module is imported
+_scratch = tempfile.mkdtemp(prefix="recipe-app-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_scratch, 'test.db')}")
+os.environ.setdefault("DB_AUTO_MIGRATE", "true")
+# Any request running more statements than its @query_budget fails the test that made it
+os.environ.setdefault("DB_QUERY_BUDGET_MODE", "raise")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("LLM_STUB_LATENCY_MS", "5")
+os.environ.setdefault("LLM_STUB_JITTER_MS", "0")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PANTRY_EXPIRY_SWEEPER_ENABLED", "false")
+
+_user_ids = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # Entering the client runs the lifespan (migrations, job workers)
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def register(client):
+    def register_user() -> dict:
+        name = f"user{next(_user_ids)}"
+        response = client.post(
+            "/auth/register",
+            json={"username": name, "email": f"{name}@example.com", "password": "secret-pw"}
+        )
+        assert response.status_code == 200, response.text
+        return {"username": name, "email": f"{name}@example.com", "password": "secret-pw"}
+    return register_user
+
+
+@pytest.fixture
+def auth_headers(client, register):
+    user = register()
+    response = client.post("/auth/login", json={"email": user["email"], "password": user["password"]})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def budgets():
+    from db.query_budget import query_budgets
+
+    yield query_budgets
+    query_budgets.clear()
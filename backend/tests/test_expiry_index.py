@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from pantry.expiry import ExpiringItemsIndex
+
+ITEMS = [{"id": 1, "ingredient_name": "milk"}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_index(max_users: int = 100, ttl: float = 60):
+    clock = Clock()
+    return ExpiringItemsIndex(max_users, ttl, timer=clock), clock
+
+
+def test_on_demand_list_is_recomputed_after_ttl():
+    index, clock = make_index()
+    index.set(1, ITEMS)
+    assert index.get(1) == ITEMS
+    clock.now = 61
+    # The window has moved on: recompute rather than miss newly expiring items
+    assert index.get(1) is None
+
+
+def test_users_missing_from_a_current_sweep_have_nothing_expiring():
+    index, clock = make_index()
+    assert index.get(2) is None
+    index.begin_sweep()
+    index.finish_sweep({1: ITEMS}, datetime.utcnow())
+    assert index.get(1) == ITEMS
+    assert index.get(2) == []
+
+    index.invalidate(2)
+    assert index.get(2) is None
+
+    clock.now = 61
+    assert index.get(1) is None
+    assert index.get(3) is None
+
+
+def test_write_during_sweep_is_not_overwritten_by_the_snapshot():
+    index, _ = make_index()
+    index.begin_sweep()
+    index.invalidate(1)
+    index.finish_sweep({1: ITEMS}, datetime.utcnow())
+    assert index.get(1) is None
+
+
+def test_index_is_bounded_and_stops_inferring_after_eviction():
+    index, _ = make_index(max_users=2)
+    index.begin_sweep()
+    index.finish_sweep({1: ITEMS, 2: ITEMS, 3: ITEMS}, datetime.utcnow())
+    assert len(index._by_user) == 2
+    # Someone was evicted, so a missing user may well have items
+    assert [index.get(user_id) for user_id in (1, 2, 3)].count(None) == 1
+    assert index.get(4) is None
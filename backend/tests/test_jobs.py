@@ -0,0 +1,44 @@
+import uuid
+from datetime import datetime, timedelta
+
+from db.main import async_session_factory
+from db.models import GenerationJob
+from jobs.service import QUEUED, RUNNING, _request_hash, job_workers
+
+
+def orphaned_job(user_id: int, status: str, theme: str) -> GenerationJob:
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    request = {"theme": theme, "language": "en", "use_pantry": False, "use_cache": True}
+    return GenerationJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        kind="recipe",
+        status=status,
+        request=request,
+        request_hash=_request_hash("recipe", request),
+        created_at=long_ago,
+        started_at=long_ago if status == RUNNING else None,
+    )
+
+
+def test_sweep_recovers_jobs_orphaned_by_a_dead_process(client, auth_headers):
+    user_id = client.get("/users/profile", headers=auth_headers).json()["id"]
+    # One died mid-run, the other was still waiting in the dead process's queue
+    jobs = [orphaned_job(user_id, RUNNING, "orphaned curry"), orphaned_job(user_id, QUEUED, "orphaned soup")]
+
+    async def insert():
+        async with async_session_factory() as session:
+            session.add_all(jobs)
+            await session.commit()
+
+    client.portal.call(insert)
+    client.portal.call(job_workers.sweep)
+    # Sweeping again while they are queued here must not queue them twice
+    client.portal.call(job_workers.sweep)
+
+    for job in jobs:
+        response = client.get(f"/jobs/{job.id}?wait=5", headers=auth_headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "succeeded", body
+        assert body["expires_at"] is not None
@@ -0,0 +1,68 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from config import settings
+from metrics import cache_lookups, record_cache_lookup
+
+SAMPLE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def scrape(client) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    samples = defaultdict(list)
+    for line in response.text.splitlines():
+        match = SAMPLE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[name].append((dict(LABEL.findall(labels)), float(value)))
+    return samples
+
+
+def test_request_latency_is_a_cumulative_histogram_per_route_template(client, auth_headers):
+    assert client.get("/recipes/saved/424242", headers=auth_headers).status_code == 404
+    samples = scrape(client)
+
+    buckets = [
+        (labels["le"], value) for labels, value in samples["http_request_duration_seconds_bucket"]
+        if labels["route"] == "/recipes/saved/{recipe_id}" and labels["method"] == "GET"
+    ]
+    assert buckets and buckets[-1][0] == "+Inf"
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)
+    count = next(
+        value for labels, value in samples["http_request_duration_seconds_count"]
+        if labels["route"] == "/recipes/saved/{recipe_id}"
+    )
+    assert counts[-1] == count >= 1
+    assert not any("424242" in labels["route"] for labels, _ in samples["http_requests_total"])
+
+
+def test_request_phases_are_recorded(client, auth_headers):
+    response = client.post("/recipes/generate", headers=auth_headers, json={"theme": "metrics gumbo", "language": "en"})
+    assert response.status_code == 200
+    samples = scrape(client)
+    phases = {
+        labels["phase"] for labels, _ in samples["http_request_phase_seconds_count"]
+        if labels["route"] == "/recipes/generate"
+    }
+    assert {"auth", "llm", "serialize"} <= phases
+    # instrument_engine attributes the taste profile lookup to the request's db phase
+    assert "db" in phases
+    queries = sum(
+        value for labels, value in samples["http_request_db_queries_sum"]
+        if labels["route"] == "/recipes/generate"
+    )
+    assert queries >= 1
+
+
+def test_cache_lookups_are_not_counted_with_metrics_disabled(monkeypatch):
+    before = cache_lookups.value("test", "hit")
+    record_cache_lookup("test", True)
+    assert cache_lookups.value("test", "hit") == before + 1
+
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    record_cache_lookup("test", True)
+    assert cache_lookups.value("test", "hit") == before + 1
@@ -0,0 +1,63 @@
+import pytest
+
+from ingredients.normalizer import IngredientMatcher, canonicalize, dedupe
+
+
+@pytest.mark.parametrize("name, expected", [
+    # Plurals
+    ("Tomatoes", "tomato"),
+    ("eggs", "egg"),
+    ("berries", "berry"),
+    ("peaches", "peach"),
+    ("radishes", "radish"),
+    ("glasses", "glass"),
+    ("cheeses", "cheese"),
+    ("olives", "olive"),
+    ("bay leaves", "bay leaf"),
+    ("cookies", "cookie"),
+    ("pies", "pie"),
+    ("brussels sprouts", "brussels sprout"),
+    # Already singular despite the "s"
+    ("hummus", "hummus"),
+    ("couscous", "couscous"),
+    ("asparagus", "asparagus"),
+    ("molasses", "molasses"),
+    ("swiss chard", "swiss chard"),
+    # Descriptors, quantities, case and accents
+    ("2 cups chopped onions", "onion"),
+    ("Freshly grated GINGER", "ginger"),
+    ("Jalapeño", "jalapeno"),
+    ("Crème fraîche", "creme fraiche"),
+    ("", ""),
+    # Synonyms across English variants and languages
+    ("Fresh Cilantro Leaves", "coriander"),
+    ("scallions", "green onion"),
+    ("Spring Onions", "green onion"),
+    ("garbanzo beans", "chickpea"),
+    ("prawns", "shrimp"),
+    ("chillies", "chili"),
+    ("dal", "lentil"),
+    ("paneer", "cottage cheese"),
+    ("aubergine", "eggplant"),
+])
+def test_canonicalize(name, expected):
+    assert canonicalize(name) == expected
+
+
+@pytest.mark.parametrize("terms, names, kept", [
+    (["peanut"], ["peanut butter", "groundnut oil", "Peanuts", "almonds"], ["almonds"]),
+    (["shrimp"], ["prawns", "shrimp paste", "fish sauce"], ["fish sauce"]),
+    (["coriander"], ["cilantro leaves", "parsley"], ["parsley"]),
+    # "egg" is a whole token, not a substring
+    (["egg"], ["eggplant", "eggs", "egg noodles"], ["eggplant"]),
+    # A multi-word term needs all of its tokens in a row
+    (["green onion"], ["scallions", "onion", "green peas"], ["onion", "green peas"]),
+    (["onion"], ["red onion", "green onion", "garlic"], ["garlic"]),
+    ([], ["anything", "at all"], ["anything", "at all"]),
+])
+def test_ingredient_matcher_filter(terms, names, kept):
+    assert IngredientMatcher(terms).filter(names) == kept
+
+
+def test_dedupe_keeps_the_first_spelling():
+    assert dedupe(["Cilantro", "coriander", "tomatoes", "Tomato", "rice"]) == ["Cilantro", "tomatoes", "rice"]
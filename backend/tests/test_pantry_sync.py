@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from pantry.schemas import PantryItemCreate
+from pantry.service import sync_pantry
+from db.main import async_session_factory
+from db.models import PantryItem
+
+
+def sync(client, headers, items):
+    response = client.put("/kitchen/items/sync", headers=headers, json={"items": items})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def stored(client, headers):
+    return {item["ingredient_name"]: item for item in client.get("/kitchen/items", headers=headers).json()}
+
+
+def test_sync_adds_updates_and_removes_in_one_call(client, auth_headers):
+    sync(client, auth_headers, [
+        {"ingredient_name": "rice", "quantity": "1kg"},
+        {"ingredient_name": "tomato", "quantity": "3"},
+        {"ingredient_name": "milk", "quantity": "1l"},
+    ])
+    before = stored(client, auth_headers)
+
+    result = sync(client, auth_headers, [
+        {"ingredient_name": "rice", "quantity": "1kg"},
+        {"ingredient_name": "Tomatoes", "quantity": "5"},
+        {"ingredient_name": "eggs", "quantity": "6"},
+    ])
+    assert (result["inserted"], result["updated"], result["deleted"], result["unchanged"]) == (1, 1, 1, 1)
+    # Returned in request order, matched rows keeping their ids
+    assert [item["ingredient_name"] for item in result["items"]] == ["rice", "Tomatoes", "eggs"]
+    assert result["items"][0]["id"] == before["rice"]["id"]
+    assert result["items"][1]["id"] == before["tomato"]["id"]
+    assert result["items"][1]["quantity"] == "5"
+
+    after = stored(client, auth_headers)
+    assert set(after) == {"rice", "Tomatoes", "eggs"}
+    assert after["Tomatoes"]["created_at"] == before["tomato"]["created_at"]
+
+
+def test_sync_matches_synonyms(client, auth_headers):
+    sync(client, auth_headers, [{"ingredient_name": "scallion", "quantity": "1 bunch"}])
+    scallion_id = stored(client, auth_headers)["scallion"]["id"]
+
+    result = sync(client, auth_headers, [{"ingredient_name": "green onion", "quantity": "2 bunches"}])
+    assert (result["inserted"], result["updated"], result["deleted"]) == (0, 1, 0)
+    assert result["items"][0]["id"] == scallion_id
+
+
+def test_sync_inserts_keep_request_order(client, auth_headers):
+    names = ["kale", "beets", "apples", "dates", "cumin"]
+    result = sync(client, auth_headers, [{"ingredient_name": name} for name in names])
+    assert [item["ingredient_name"] for item in result["items"]] == names
+    ids = [item["id"] for item in result["items"]]
+    assert ids == sorted(ids)
+
+
+def test_sync_returns_pantry_items(client, auth_headers):
+    user_id = client.get("/users/profile", headers=auth_headers).json()["id"]
+    sync(client, auth_headers, [{"ingredient_name": "rice"}])
+    tomorrow = datetime.utcnow() + timedelta(days=1)
+
+    async def run():
+        async with async_session_factory() as session:
+            return await sync_pantry(session, user_id, [
+                PantryItemCreate(ingredient_name="rice", quantity="2kg"),
+                PantryItemCreate(ingredient_name="yogurt", expiry_date=tomorrow),
+            ])
+
+    result = client.portal.call(run)
+    assert all(isinstance(item, PantryItem) for item in result["items"])
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from llm.parsing import _strip_trailing_commas, generate_items, parse_json
+
+
+class Item(BaseModel):
+    title: str
+
+
+def test_clean_json():
+    result = parse_json('{"a": 1}')
+    assert result.data == {"a": 1}
+    assert result.status == "clean"
+
+
+def test_fences_prose_and_trailing_commas():
+    result = parse_json('Here you go:\n```json\n{"a": [1, 2,], "b": {"c": 3,},}\n```')
+    assert result.data == {"a": [1, 2], "b": {"c": 3}}
+    assert result.status == "repaired"
+
+
+def test_escaped_quote_does_not_end_string():
+    result = parse_json('{"a": "a 9\\" pan", "b": [1,2,]}')
+    assert result.data == {"a": 'a 9" pan', "b": [1, 2]}
+
+
+def test_commas_and_brackets_inside_strings_are_kept():
+    result = parse_json('{"t": "9\\" pan, ]", "u": "x, }", "b": [1,]}')
+    assert result.data == {"t": '9" pan, ]', "u": "x, }", "b": [1]}
+
+
+def test_escaped_backslash_before_quote_ends_string():
+    assert _strip_trailing_commas('{"a": "c:\\\\", "b": [1,]}') == '{"a": "c:\\\\", "b": [1]}'
+
+
+def test_truncated_array_keeps_complete_items():
+    result = parse_json('{"items": [{"title": "A"}, {"title": "B, [\\"x\\"]"}, {"title": "C')
+    assert result.status == "truncated"
+    assert result.data == {"items": [{"title": "A"}, {"title": 'B, ["x"]'}]}
+
+
+def test_truncated_inside_nested_object_drops_partial_item():
+    result = parse_json('{"items": [{"title": "A", "tags": ["x"]}, {"title": "B", "tags": ["y"')
+    assert result.data == {"items": [{"title": "A", "tags": ["x"]}]}
+
+
+def test_unrepairable_raises():
+    with pytest.raises(ValueError):
+        parse_json("no json here")
+
+
+def test_generate_items_requests_only_the_remainder():
+    replies = ['{"items": [{"title": "A"}, {"title": "B"}, {"title": "C', '{"items": [{"title": "C2"}]}']
+    prompts = []
+
+    async def generate(prompt, response_schema=None):
+        prompts.append(prompt)
+        return replies[len(prompts) - 1]
+
+    items = asyncio.run(generate_items(generate, "suggest", "items", Item, 3, "test"))
+    assert [item["title"] for item in items] == ["A", "B", "C2"]
+    assert "Return only 1 more" in prompts[1]
@@ -0,0 +1,99 @@
+"""Every request in this suite runs under DB_QUERY_BUDGET_MODE=raise (see conftest.py),
+so an endpoint going over its @query_budget, or repeating a statement, fails the test."""
+import asyncio
+
+import pytest
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import main
+from db.main import get_session
+from db.models import User
+from db.query_budget import QueryBudgetExceeded, assert_query_budget, install_query_log
+
+
+def test_register_runs_within_budget(client, register):
+    user = register()
+    duplicate = client.post("/auth/register", json=user)
+    assert duplicate.status_code == 400
+
+
+def test_profile_is_a_single_join_once_the_user_is_cached(client, auth_headers, budgets):
+    # First call fills the auth cache; after that the profile itself may only cost one statement
+    assert client.get("/users/profile", headers=auth_headers).status_code == 200
+    budgets.set("GET", "/users/profile", 1)
+    response = client.get("/users/profile", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["taste_profile"] is not None
+
+
+def test_budgeted_endpoints(client, auth_headers):
+    item = client.post("/kitchen/items", headers=auth_headers, json={"ingredient_name": "rice", "quantity": "1kg"})
+    assert item.status_code == 200, item.text
+    assert [i["ingredient_name"] for i in client.get("/kitchen/items", headers=auth_headers).json()] == ["rice"]
+
+    recipe = client.post("/recipes/generate", headers=auth_headers, json={"theme": "italian", "language": "en"})
+    assert recipe.status_code == 200, recipe.text
+
+    batch = client.post(
+        "/recipes/generate/batch", headers=auth_headers,
+        json={"themes": ["thai", "mexican", "greek"], "language": "en"}
+    )
+    assert batch.status_code == 200, batch.text
+    assert len(batch.json()["items"]) == 3
+
+    assert client.get("/recipes/saved", headers=auth_headers).status_code == 200
+    assert client.get("/dboard/stats", headers=auth_headers).status_code == 200
+
+    leftover = client.post("/remainings/ingredients", headers=auth_headers, json={"ingredient_name": "bread"})
+    assert leftover.status_code == 200, leftover.text
+    transform = client.post("/remainings/transform", headers=auth_headers, json={"language": "en"})
+    assert transform.status_code == 200, transform.text
+
+
+def test_job_polling_runs_within_budget(client, auth_headers):
+    accepted = client.post("/recipes/generate?job=true", headers=auth_headers, json={"theme": "soup", "language": "en"})
+    assert accepted.status_code == 202, accepted.text
+    job = client.get(accepted.headers["Location"] + "?wait=5", headers=auth_headers)
+    assert job.status_code == 200
+    assert job.json()["status"] == "succeeded"
+
+
+def test_overridden_budget_raises(client, auth_headers, budgets):
+    budgets.set("GET", "/recipes/saved", 0)
+    with pytest.raises(QueryBudgetExceeded, match="budget is 0"):
+        client.get("/recipes/saved", headers=auth_headers)
+
+
+def test_repeated_statement_in_a_request_raises(client, auth_headers):
+    async def users_one_by_one(session: AsyncSession = Depends(get_session)):
+        for user_id in (1, 2, 3):
+            await session.execute(select(User).where(User.id == user_id))
+        return {}
+
+    main.app.add_api_route("/test-n-plus-one", users_one_by_one)
+    try:
+        with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+            client.get("/test-n-plus-one")
+    finally:
+        main.app.router.routes.pop()
+
+
+def test_assert_query_budget_catches_a_loop():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        install_query_log(engine)
+        try:
+            async with engine.connect() as conn:
+                with assert_query_budget(None, repeat_threshold=3):
+                    await conn.exec_driver_sql("SELECT 1")
+                    await conn.exec_driver_sql("SELECT 2")
+                with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+                    with assert_query_budget(None, repeat_threshold=3):
+                        for n in range(3):
+                            await conn.exec_driver_sql(f"SELECT {n}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+import pytest
+
+from config import settings
+from ratelimit import rate_limiter
+
+
+@pytest.fixture
+def recipe_limit(monkeypatch):
+    # One recipe request, never refilled
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "limits", {"recipe": (0, 1)})
+    rate_limiter.clear()
+    yield
+    rate_limiter.clear()
+
+
+def test_sync_request_is_charged(client, auth_headers, recipe_limit):
+    body = {"theme": "curry", "language": "en"}
+    assert client.post("/recipes/generate", headers=auth_headers, json=body).status_code == 200
+    assert client.post("/recipes/generate", headers=auth_headers, json=body).status_code == 429
+
+
+def test_job_retry_with_idempotency_key_is_not_charged(client, auth_headers, recipe_limit):
+    headers = {**auth_headers, "Idempotency-Key": "plan-1"}
+    body = {"theme": "tapas", "language": "en"}
+    first = client.post("/recipes/generate?job=true", headers=headers, json=body)
+    assert first.status_code == 202, first.text
+    retry = client.post("/recipes/generate?job=true", headers=headers, json=body)
+    assert retry.status_code == 202, retry.text
+    assert retry.json()["id"] == first.json()["id"]
+
+    # A genuinely new job still needs a token
+    other = client.post("/recipes/generate?job=true", headers=auth_headers, json={"theme": "stew", "language": "en"})
+    assert other.status_code == 429
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import recipes.service as recipe_module
+from recipes.schemas import RecipeGenerationRequest
+from recipes.service import RecipeService, recipe_service
+
+
+def login(client, user) -> dict:
+    response = client.post("/auth/login", json={"email": user["email"], "password": user["password"]})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    async def record_generation(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(recipe_module, "record_generation", record_generation)
+    service = RecipeService()
+    calls = []
+    generate = service.llm.generate
+
+    async def counting_generate(*args, **kwargs):
+        calls.append(args)
+        return await generate(*args, **kwargs)
+
+    monkeypatch.setattr(service.llm, "generate", counting_generate)
+    service.calls = calls
+    return service
+
+
+def test_users_without_expiring_items_share_the_cache(service):
+    request = RecipeGenerationRequest(theme="Ramen", language="en")
+
+    async def run():
+        first = await service.generate_with_profile(request, None, user_id=1)
+        second = await service.generate_with_profile(request, None, user_id=2)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(service.calls) == 1
+
+
+def test_pantry_requests_with_expiring_items_bypass_the_shared_cache(service):
+    request = RecipeGenerationRequest(theme="Ramen", language="en")
+    pantry_request = RecipeGenerationRequest(theme="Ramen", language="en", use_pantry=True)
+
+    async def run():
+        await service.generate_with_profile(request, None, user_id=1)
+        await service.generate_with_profile(pantry_request, None, user_id=2, expiring=["spinach"])
+        await service.generate_with_profile(pantry_request, None, user_id=2, expiring=["spinach"])
+
+    asyncio.run(run())
+    # Neither read from the cache (user 1's recipe ignores the spinach) nor written to it
+    assert len(service.calls) == 3
+    assert service._recipe_cache_key(pantry_request, None, ["spinach"]) is None
+    assert service.cache.get(service._recipe_cache_key(request, None)) is not None
+
+
+def test_expiring_items_are_ignored_without_use_pantry(service):
+    request = RecipeGenerationRequest(theme="Ramen", language="en")
+
+    async def run():
+        first = await service.generate_with_profile(request, None, user_id=1)
+        second = await service.generate_with_profile(request, None, user_id=2, expiring=["spinach"])
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(service.calls) == 1
+    assert "spinach" not in service.calls[0][0]
+
+
+def test_user_with_expiring_items_is_served_from_the_cache(client, register, monkeypatch):
+    calls = []
+    generate = recipe_service.llm.generate
+
+    async def counting_generate(*args, **kwargs):
+        calls.append(args)
+        return await generate(*args, **kwargs)
+
+    monkeypatch.setattr(recipe_service.llm, "generate", counting_generate)
+    headers = [login(client, register()) for _ in range(2)]
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    item = client.post("/kitchen/items", headers=headers[1], json={"ingredient_name": "spinach", "expiry_date": tomorrow})
+    assert item.status_code == 200, item.text
+
+    body = {"theme": "shared cache udon", "language": "en"}
+    first = client.post("/recipes/generate", headers=headers[0], json=body)
+    second = client.post("/recipes/generate", headers=headers[1], json=body)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1
+
+    # Asking for pantry-aware recipes brings the spinach into a personal prompt
+    pantry = client.post("/recipes/generate", headers=headers[1], json={**body, "use_pantry": True})
+    assert pantry.status_code == 200
+    assert len(calls) == 2
+    assert "spinach" in calls[1][0]
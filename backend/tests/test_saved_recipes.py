@@ -0,0 +1,27 @@
+import pytest
+from pydantic import ValidationError
+
+import leftovers.routes
+import recipes.routes
+
+SUMMARY_ROUTES = [
+    ("/recipes/saved/summary", recipes.routes, "get_saved_recipe_summaries"),
+    ("/remainings/saved-transformations/summary", leftovers.routes, "get_saved_transformation_summaries"),
+]
+
+
+@pytest.mark.parametrize("path, module, service", SUMMARY_ROUTES)
+def test_malformed_cursor_is_a_client_error(client, auth_headers, path, module, service):
+    response = client.get(f"{path}?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path, module, service", SUMMARY_ROUTES)
+def test_serialization_error_is_not_reported_as_a_client_error(client, auth_headers, monkeypatch, path, module, service):
+    async def broken_page(*args, **kwargs):
+        return {"items": [{"id": "not an id"}], "next_cursor": None}
+
+    monkeypatch.setattr(module, service, broken_page)
+    # A server error: TestClient re-raises it instead of answering 400
+    with pytest.raises(ValidationError):
+        client.get(path, headers=auth_headers)
@@ -0,0 +1,97 @@
+import asyncio
+
+from llm.scheduler import FairScheduler, schedule_as
+
+
+def assert_idle(scheduler: FairScheduler):
+    assert scheduler.in_flight == 0
+    assert scheduler._running == {}
+    assert scheduler._waiting == {}
+
+
+def test_light_tenant_gets_the_next_freed_slot():
+    async def run():
+        scheduler = FairScheduler(max_concurrency=2)
+        release = asyncio.Event()
+        order = []
+
+        async def call(tenant: str, name: str):
+            schedule_as(tenant)
+            async with scheduler.slot():
+                order.append(name)
+                await release.wait()
+
+        # The heavy tenant fills both slots and queues three more calls before the light one arrives
+        tasks = [asyncio.create_task(call("heavy", f"heavy{i}")) for i in range(5)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("light", "light")))
+        await asyncio.sleep(0)
+        assert scheduler.queued == 4
+        assert scheduler.queued_tenants == 2
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        assert order[:3] == ["heavy0", "heavy1", "light"]
+        assert_idle(scheduler)
+
+    asyncio.run(run())
+
+
+def test_waiter_cancelled_after_being_granted_passes_its_slot_on():
+    async def run():
+        scheduler = FairScheduler(max_concurrency=1)
+        release = asyncio.Event()
+        entered = []
+
+        async def call(tenant: str):
+            schedule_as(tenant)
+            async with scheduler.slot():
+                entered.append(tenant)
+                await release.wait()
+
+        schedule_as("a")
+        holder = scheduler.slot()
+        await holder.__aenter__()
+        granted = asyncio.create_task(call("b"))
+        after = asyncio.create_task(call("c"))
+        await asyncio.sleep(0)
+        assert scheduler.queued == 2
+
+        # Freeing the slot grants it to "b", which is cancelled before it gets to run
+        await holder.__aexit__(None, None, None)
+        assert scheduler._running == {"b": 1}
+        granted.cancel()
+        await asyncio.gather(granted, return_exceptions=True)
+        release.set()
+
+        # Hangs if the slot granted to "b" was lost with it
+        await asyncio.wait_for(after, timeout=1)
+        assert entered == ["c"]
+        assert_idle(scheduler)
+
+    asyncio.run(run())
+
+
+def test_waiter_cancelled_while_queued_is_forgotten():
+    async def run():
+        scheduler = FairScheduler(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def call(tenant: str):
+            schedule_as(tenant)
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(call("a"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(call("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.queued == 0
+
+        release.set()
+        await asyncio.wait_for(holder, timeout=1)
+        assert_idle(scheduler)
+
+    asyncio.run(run())
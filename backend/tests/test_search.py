@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+
+from db.main import async_session_factory
+from db.models import SavedRecipe
+from db.search import create_search_index, saved_recipes_search
+
+
+def save(client, headers, title, ingredients, tags=(), instructions=("Cook it.",)):
+    recipe = {
+        "title": title,
+        "description": "",
+        "ingredients": [{"name": name, "quantity": "1", "unit": "cup"} for name in ingredients],
+        "instructions": list(instructions),
+        "cooking_time": "20 minutes",
+        "difficulty": "easy",
+        "nutrition_info": {"calories": "400", "protein": "10g", "carbs": "50g", "fat": "10g"},
+        "tags": list(tags),
+    }
+    response = client.post("/recipes/save-generated", headers=headers, json=recipe)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def search(client, headers, q):
+    response = client.get("/recipes/saved/search", headers=headers, params={"q": q})
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["items"]]
+
+
+def test_search_finds_new_recipes_by_any_field(client, auth_headers):
+    dal = save(client, auth_headers, "Weeknight dal", ["red lentils", "cumin"], tags=["vegan"])
+    pasta = save(client, auth_headers, "Pasta", ["spaghetti"], instructions=["Toss with pecorino."])
+
+    assert search(client, auth_headers, "dal") == [dal]
+    assert search(client, auth_headers, "lentils cumin") == [dal]
+    assert search(client, auth_headers, "vegan") == [dal]
+    # Instructions are indexed from inside the JSON recipe_data
+    assert search(client, auth_headers, "pecorino") == [pasta]
+    assert search(client, auth_headers, "lentils spaghetti") == []
+
+
+def test_last_term_matches_as_a_prefix(client, auth_headers):
+    risotto = save(client, auth_headers, "Mushroom risotto", ["arborio rice", "mushrooms"])
+    assert search(client, auth_headers, "mushroom ris") == [risotto]
+    # Only the last term is a prefix
+    assert search(client, auth_headers, "mush risotto") == []
+
+
+def test_search_follows_updates_and_deletes(client, auth_headers):
+    recipe_id = save(client, auth_headers, "Tomato soup", ["tomatoes"])
+    assert search(client, auth_headers, "tomato") == [recipe_id]
+
+    async def rename():
+        async with async_session_factory() as session:
+            await session.execute(
+                update(SavedRecipe).where(SavedRecipe.id == recipe_id).values(recipe_title="Gazpacho")
+            )
+            await session.commit()
+
+    client.portal.call(rename)
+    assert search(client, auth_headers, "gazpacho") == [recipe_id]
+    assert search(client, auth_headers, "soup") == []
+
+    assert client.delete(f"/recipes/saved/{recipe_id}", headers=auth_headers).status_code == 200
+    assert search(client, auth_headers, "gazpacho") == []
+
+
+def test_search_only_returns_the_users_own_recipes(client, register):
+    headers = []
+    for _ in range(2):
+        user = register()
+        token = client.post("/auth/login", json={"email": user["email"], "password": user["password"]}).json()
+        headers.append({"Authorization": f"Bearer {token['access_token']}"})
+    mine = save(client, headers[0], "Shakshuka", ["eggs", "peppers"])
+
+    assert search(client, headers[0], "shakshuka") == [mine]
+    assert search(client, headers[1], "shakshuka") == []
+
+
+def test_unsupported_database_is_rejected_by_the_migration():
+    conn = SimpleNamespace(dialect=SimpleNamespace(name="mysql"))
+    with pytest.raises(RuntimeError, match="mysql"):
+        create_search_index(conn, saved_recipes_search)
@@ -0,0 +1,96 @@
+import asyncio
+
+import dashboard.service as dashboard_service
+from dashboard.service import GenerationTally, record_generation
+from llm.singleflight import SingleFlight
+
+
+def test_duplicates_share_one_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(3)))
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["done"] * 3
+
+
+def test_call_survives_while_any_waiter_remains():
+    async def scenario():
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leaving = asyncio.create_task(flights.do("k", work))
+        staying = asyncio.create_task(flights.do("k", work))
+        await started.wait()
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_call_is_cancelled_when_every_waiter_leaves():
+    async def scenario():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        finished = False
+
+        async def work():
+            nonlocal finished
+            started.set()
+            await asyncio.sleep(1)
+            finished = True
+
+        waiters = [asyncio.create_task(flights.do("k", work)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flights.in_flight(), finished
+
+    assert asyncio.run(scenario()) == (0, False)
+
+
+def test_generations_recorded_after_flush_are_not_lost(monkeypatch):
+    written = []
+
+    async def fake_flush(user_id, deltas):
+        written.append((user_id, dict(deltas)))
+
+    monkeypatch.setattr(dashboard_service, "flush_generation_stats", fake_flush)
+
+    async def scenario():
+        tally = GenerationTally(7)
+
+        async def generation():
+            tally.collect()
+            await record_generation(7, "recipe", cache_hit=True)
+            await asyncio.sleep(0.01)
+            # Finishes after the batch has already written its tally
+            await record_generation(7, "recipe", cache_hit=True)
+
+        task = asyncio.create_task(generation())
+        await asyncio.sleep(0)
+        await tally.flush()
+        await task
+
+    asyncio.run(scenario())
+    assert written == [
+        (7, {"recipes_generated_count": 1, "cache_hits": 1}),
+        (7, {"recipes_generated_count": 1, "cache_hits": 1}),
+    ]
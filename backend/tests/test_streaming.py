@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from recipes.streaming import RecipeStreamParser
+
+RECIPE = {
+    "title": 'Dal "tadka" {weeknight} [easy]',
+    "description": "Lentils, tempered \\ with ghee; serves 4 — enjoy",
+    "ingredients": [
+        {"name": "red lentils", "quantity": "1 cup"},
+        {"name": "ghee {or oil}", "quantity": "2 tbsp"},
+    ],
+    "instructions": ["Rinse the lentils, then simmer.", 'Fry cumin until it "pops", then pour over.'],
+    "cooking_time": 25,
+    "difficulty": "easy",
+    "nutrition_info": {"calories": 320, "notes": ["high protein", "}"]},
+    "vegetarian": True,
+    "tags": [],
+}
+DOCUMENT = "```json\n" + json.dumps(RECIPE, indent=2, ensure_ascii=False) + "\n```"
+
+EXPECTED = [
+    ("title", RECIPE["title"]),
+    ("description", RECIPE["description"]),
+    ("ingredient", {"index": 0, "value": RECIPE["ingredients"][0]}),
+    ("ingredient", {"index": 1, "value": RECIPE["ingredients"][1]}),
+    ("instruction", {"index": 0, "value": RECIPE["instructions"][0]}),
+    ("instruction", {"index": 1, "value": RECIPE["instructions"][1]}),
+    ("cooking_time", 25),
+    ("difficulty", "easy"),
+    ("nutrition_info", RECIPE["nutrition_info"]),
+    ("vegetarian", True),
+]
+
+
+def feed_in_chunks(size: int):
+    parser = RecipeStreamParser()
+    events = []
+    for start in range(0, len(DOCUMENT), size):
+        events.extend(parser.feed(DOCUMENT[start:start + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 3, len(DOCUMENT)])
+def test_same_events_at_any_chunk_size(size):
+    parser, events = feed_in_chunks(size)
+    assert events == EXPECTED
+    assert parser.done
+    assert json.loads(parser.buffer[parser.buffer.index("{"):parser.buffer.rindex("}") + 1]) == RECIPE
+
+
+def test_nothing_after_the_closing_brace_is_parsed():
+    parser = RecipeStreamParser()
+    parser.feed('{"title": "Soup"}')
+    assert parser.feed(' {"title": "Again"}') == []
@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.main import get_session
+from db.query_budget import query_budget
+from responses import model_response
 from auth.service import get_current_user
 from db.models import User, UserTasteProfile
 from sqlmodel import select
@@ -13,12 +15,14 @@ router = APIRouter()
 
 
 @router.get("/profile", response_model=UserProfileResponse)
+@query_budget(2)
 async def get_profile(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     user_profile = await get_user_profile(session, current_user.id)
-    return user_profile
+    # Already a validated UserProfileResponse; dump it without a second validation pass
+    return model_response(UserProfileResponse, user_profile)
 @router.get("/taste-profile", response_model=TasteProfileResponse)
 async def get_taste_profile(
     current_user: User = Depends(get_current_user),
@@ -8,44 +8,26 @@ from users.schemas import TasteProfileUpdate, TasteProfileCreate,UserProfileResp
 
 
 async def get_user_profile(session: AsyncSession, user_id: int) -> UserProfileResponse:
-    # Get user with taste_profile eagerly loaded
+    # User and taste profile in one round trip; an outer join, since the profile may not exist
     result = await session.execute(
-        select(User).where(User.id == user_id)
+        select(User, UserTasteProfile)
+        .outerjoin(UserTasteProfile, UserTasteProfile.user_id == User.id)
+        .where(User.id == user_id)
     )
-    user = result.scalar_one_or_none()
+    row = result.first()
     
-    if not user:
+    if not row:
         raise ValueError("User not found")
+    user, taste_profile = row
     
-    # Get taste profile separately to avoid async relationship issues
-    taste_profile_result = await session.execute(
-        select(UserTasteProfile).where(UserTasteProfile.user_id == user_id)
-    )
-    taste_profile = taste_profile_result.scalar_one_or_none()
-    
-    # Convert to response model
-    taste_profile_response = None
-    if taste_profile:
-        taste_profile_response = TasteProfileResponse(
-            id=taste_profile.id,
-            user_id=taste_profile.user_id,
-            likes=taste_profile.likes,
-            dislikes=taste_profile.dislikes,
-            dietary_preferences=taste_profile.dietary_preferences,
-            allergies=taste_profile.allergies,
-            spice_level=taste_profile.spice_level,
-            oil_preference=taste_profile.oil_preference,
-            cooking_time_preference=taste_profile.cooking_time_preference,
-            updated_at=taste_profile.updated_at
-        )
-    
+    # Validate straight from the ORM rows; the route dumps the result without re-validating
     return UserProfileResponse(
         id=user.id,
         username=user.username,
         email=user.email,
         preferred_language=user.preferred_language,
         created_at=user.created_at,
-        taste_profile=taste_profile_response
+        taste_profile=TasteProfileResponse.model_validate(taste_profile) if taste_profile else None
     )
 async def create_taste_profile(
     session: AsyncSession, 
@@ -56,7 +38,6 @@ async def create_taste_profile(
     taste_profile = UserTasteProfile(user_id=user_id, **profile_data.dict())
     session.add(taste_profile)
     await session.commit()
-    await session.refresh(taste_profile)
     return taste_profile
 
 async def update_taste_profile(
@@ -81,7 +62,6 @@ async def update_taste_profile(
     taste_profile.updated_at = datetime.utcnow()
     
     await session.commit()
-    await session.refresh(taste_profile)
     return taste_profile
 
 async def get_or_create_taste_profile(
@@ -99,6 +79,5 @@ async def get_or_create_taste_profile(
         taste_profile = UserTasteProfile(user_id=user_id)
         session.add(taste_profile)
         await session.commit()
-        await session.refresh(taste_profile)
     
     return taste_profile
\ No newline at end of file